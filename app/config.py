@@ -0,0 +1,85 @@
+import os
+
+# 크롤링 작업 큐 설정
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "4"))
+CRAWL_JOB_RETENTION = int(os.getenv("CRAWL_JOB_RETENTION", "1000"))
+# 빈 세션을 기다리다가 큐의 최우선 작업을 다시 확인하는 간격(초)
+CRAWL_DISPATCH_WAIT = float(os.getenv("CRAWL_DISPATCH_WAIT", "1"))
+
+# 로그인된 instagrapi 클라이언트 풀 설정
+CLIENT_REVALIDATE_SECONDS = int(os.getenv("CLIENT_REVALIDATE_SECONDS", "1800"))
+
+# 계정별 요청 예산(토큰 버킷)과 쿨다운 설정
+SESSION_REQUESTS_PER_HOUR = float(os.getenv("SESSION_REQUESTS_PER_HOUR", "200"))
+SESSION_BURST = int(os.getenv("SESSION_BURST", "20"))
+SESSION_MAX_LEASES = int(os.getenv("SESSION_MAX_LEASES", "1"))
+SESSION_ACQUIRE_TIMEOUT = float(os.getenv("SESSION_ACQUIRE_TIMEOUT", "300"))
+# 적응형 요청 속도(AIMD): 성공하면 조금씩 올리고 429/대기 요청을 받으면 절반으로
+PACING_MIN_PER_HOUR = float(os.getenv("PACING_MIN_PER_HOUR", "30"))
+PACING_MAX_PER_HOUR = float(os.getenv("PACING_MAX_PER_HOUR", "1200"))
+PACING_INCREASE_PER_HOUR = float(os.getenv("PACING_INCREASE_PER_HOUR", "5"))
+PACING_DECREASE_FACTOR = float(os.getenv("PACING_DECREASE_FACTOR", "0.5"))
+PACING_WINDOW_SECONDS = int(os.getenv("PACING_WINDOW_SECONDS", "300"))
+# 지수 백오프(jitter 포함)와 계정별 재시도 예산
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", "10"))
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "2"))
+BACKOFF_MAX_SECONDS = float(os.getenv("BACKOFF_MAX_SECONDS", "300"))
+TEMP_BLOCK_SECONDS = int(os.getenv("TEMP_BLOCK_SECONDS", "1800"))
+FEEDBACK_BLOCK_SECONDS = int(os.getenv("FEEDBACK_BLOCK_SECONDS", str(12 * 3600)))
+
+# NDJSON 내보내기 배치 크기
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# 해시태그 fan-out: 세션당 동시 요청 수
+HASHTAG_SESSION_CONCURRENCY = int(os.getenv("HASHTAG_SESSION_CONCURRENCY", "2"))
+# 요청 본문으로 올릴 수 있는 계정당 동시 요청 상한 (pacing 보호)
+HASHTAG_SESSION_CONCURRENCY_MAX = int(os.getenv("HASHTAG_SESSION_CONCURRENCY_MAX", "4"))
+
+# 해시태그 watch: 태그별 폴링 간격은 새 게시물 속도에 맞춰 MIN~MAX 사이에서 조정
+HASHTAG_WATCH_TICK_SECONDS = float(os.getenv("HASHTAG_WATCH_TICK_SECONDS", "10"))
+HASHTAG_WATCH_BATCH = int(os.getenv("HASHTAG_WATCH_BATCH", "50"))
+HASHTAG_WATCH_MIN_INTERVAL = int(os.getenv("HASHTAG_WATCH_MIN_INTERVAL", "120"))
+HASHTAG_WATCH_MAX_INTERVAL = int(os.getenv("HASHTAG_WATCH_MAX_INTERVAL", str(6 * 3600)))
+HASHTAG_WATCH_DEFAULT_INTERVAL = int(os.getenv("HASHTAG_WATCH_DEFAULT_INTERVAL", "900"))
+HASHTAG_WATCH_PAGE_SIZE = int(os.getenv("HASHTAG_WATCH_PAGE_SIZE", "27"))
+HASHTAG_WATCH_MAX_PAGES = int(os.getenv("HASHTAG_WATCH_MAX_PAGES", "10"))
+
+# TTL 캐시 (메모리 LRU + 선택적 DB 계층)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_PERSISTENT = os.getenv("CACHE_PERSISTENT", "false").lower() in ("1", "true", "yes")
+CACHE_TTL_HASHTAG = int(os.getenv("CACHE_TTL_HASHTAG", "60"))
+CACHE_TTL_USER_ID = int(os.getenv("CACHE_TTL_USER_ID", str(7 * 24 * 3600)))
+
+# 데이터베이스 연결 설정 (DATABASE_URL 미설정 시 프로젝트 루트의 SQLite 사용)
+DATABASE_URL = os.getenv("DATABASE_URL")
+# 미설정 시 DATABASE_URL의 드라이버를 async 드라이버로 바꿔 사용
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+# 캡션 전문 검색: PostgreSQL text search 설정 (SQLite는 FTS5 unicode61 사용)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+# 프록시 풀: PROXY_URLS(쉼표 구분)는 시작 시 DB에 등록
+PROXY_URLS = [url.strip() for url in os.getenv("PROXY_URLS", "").split(",") if url.strip()]
+PROXY_CHECK_URL = os.getenv("PROXY_CHECK_URL", "https://www.instagram.com/robots.txt")
+PROXY_CHECK_INTERVAL = int(os.getenv("PROXY_CHECK_INTERVAL", "300"))
+PROXY_CHECK_TIMEOUT = float(os.getenv("PROXY_CHECK_TIMEOUT", "10"))
+PROXY_MAX_LATENCY_MS = int(os.getenv("PROXY_MAX_LATENCY_MS", "5000"))
+PROXY_MAX_FAILURES = int(os.getenv("PROXY_MAX_FAILURES", "3"))
+
+# 미디어 파일 다운로드: 콘텐츠 해시(sha256) 기준으로 같은 파일은 한 번만 저장
+DOWNLOAD_MEDIA = os.getenv("DOWNLOAD_MEDIA", "false").lower() in ("1", "true", "yes")
+# 미설정 시 프로젝트 루트의 media_assets 디렉토리 사용
+MEDIA_DIR = os.getenv("MEDIA_DIR")
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_QUEUE_SIZE = int(os.getenv("DOWNLOAD_QUEUE_SIZE", "1000"))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "60"))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
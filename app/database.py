@@ -1,23 +1,97 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
-# 프로젝트 루트 디렉토리에 데이터베이스 파일 생성
+from app import config
+from app.metrics import instrument_engine
+
+# 기본값: 프로젝트 루트 디렉토리에 데이터베이스 파일 생성
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'insta_scraper.db')}"
+DATABASE_URL = config.DATABASE_URL or f"sqlite:///{os.path.join(BASE_DIR, 'insta_scraper.db')}"
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# 방언별 INSERT ... ON CONFLICT 지원
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# 동기 URL의 드라이버를 async 드라이버로 교체 (예: sqlite -> sqlite+aiosqlite)
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def _async_url(url: str) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or _async_url(DATABASE_URL)
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+
+def _engine_options():
+    options = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    }
+    if IS_SQLITE:
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    else:
+        # 서버 DB는 끊어진 연결을 재사용하지 않도록 확인/재생성
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = config.DB_POOL_RECYCLE
+    return options
+
+
+engine = create_engine(DATABASE_URL, **_engine_options())
+
+# FastAPI 엔드포인트용: 이벤트 루프를 막지 않는 async 엔진
+# (aiosqlite 기본값은 NullPool이므로 풀을 명시)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **_engine_options()
 )
 
+
+if IS_SQLITE:
+
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL: 읽기가 쓰기를 기다리지 않음, busy_timeout: 쓰기 잠금 대기
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 SessionLocal = sessionmaker(
     autocommit=False, 
     autoflush=False, 
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -27,7 +101,42 @@ def get_db():
     finally:
         db.close()
 
+
+@contextmanager
+def session_scope():
+    """Unit of work: commit on success, roll back on error, always close"""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def add_missing_columns():
+    """Add columns that were added to existing models (create_all skips existing tables)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+
+
 # 데이터베이스 테이블 생성
 def init_db():
     from app.models import InstagramSession, InstagramPosts  # 모델 import
+    from app.search import install_search_index
+
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    install_search_index(engine)
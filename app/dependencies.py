@@ -1,6 +1,7 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal, SessionLocal
 
 
 def get_db():
@@ -9,3 +10,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
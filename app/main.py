@@ -1,18 +1,85 @@
-from fastapi import FastAPI
+import time
 
-from .views import post_views, session_views, hashtag_views
-from .database import init_db
+from fastapi import FastAPI, Request, Response
+
+from .views import (
+    asset_views,
+    hashtag_views,
+    job_views,
+    post_views,
+    proxy_views,
+    search_views,
+    session_views,
+    stats_views,
+    watch_views,
+)
+from .config import PROXY_URLS
+from .database import SessionLocal, async_engine, init_db
+from .metrics import HTTP_REQUEST_SECONDS, render_metrics
+from scraper.cache import cache
+from scraper.downloads import media_downloader
+from scraper.jobs import crawl_queue
+from scraper.proxies import proxy_pool
+from scraper.stats import ensure_profile_stats
+from scraper.watches import hashtag_watcher
 
 app = FastAPI()
 
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # 경로 템플릿으로 라벨링해서 카디널리티를 제한
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status),
+        ).observe(time.perf_counter() - started)
+
+
 # 앱 시작 시 데이터베이스 초기화
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    cache.purge_expired()
+    db = SessionLocal()
+    try:
+        ensure_profile_stats(db)
+        if PROXY_URLS:
+            proxy_pool.seed(db, PROXY_URLS)
+    finally:
+        db.close()
+    await proxy_pool.start()
+    await media_downloader.start()
+    await crawl_queue.start()
+    await hashtag_watcher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await hashtag_watcher.stop()
+    await crawl_queue.stop()
+    await media_downloader.stop()
+    await proxy_pool.stop()
+    await async_engine.dispose()
+
 
 app.include_router(session_views.router)
 app.include_router(post_views.router)
 app.include_router(hashtag_views.router)
+app.include_router(job_views.router)
+app.include_router(proxy_views.router)
+app.include_router(asset_views.router)
+app.include_router(watch_views.router)
+app.include_router(search_views.router)
+app.include_router(stats_views.router)
 
 
 # """
@@ -23,6 +90,12 @@ Base.metadata.create_all(bind=engine)
 # """
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to InstaScraper API"}
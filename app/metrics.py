@@ -0,0 +1,117 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+# 업스트림 요청은 수 초까지, DB 쿼리는 ms 단위까지 구분
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+UPSTREAM_SECONDS = Histogram(
+    "instagram_upstream_request_seconds",
+    "Latency of upstream instagrapi calls",
+    ["endpoint", "session", "outcome"],
+    buckets=UPSTREAM_BUCKETS,
+)
+LOGIN_SECONDS = Histogram(
+    "instagram_login_seconds",
+    "Latency of instagrapi logins and session revalidation",
+    ["session", "kind", "outcome"],
+    buckets=UPSTREAM_BUCKETS,
+)
+SESSION_EVENTS = Counter(
+    "instagram_session_events_total",
+    "Rate-limit, challenge and block events per session",
+    ["session", "event"],
+)
+PACING_RATE = Gauge(
+    "instagram_pacing_rate_per_hour",
+    "Current adaptive request rate per session and endpoint",
+    ["session", "endpoint"],
+)
+CRAWL_PAGE_SECONDS = Histogram(
+    "crawl_page_seconds",
+    "Time per crawled page, split into upstream fetch and DB save",
+    ["stage"],
+    buckets=UPSTREAM_BUCKETS,
+)
+CRAWL_MEDIA = Counter("crawl_media_total", "Media saved by profile crawls", ["kind"])
+CRAWL_JOBS = Counter("crawl_jobs_total", "Finished crawl jobs", ["status"])
+CRAWL_QUEUE_DEPTH = Gauge("crawl_queue_depth", "Crawl jobs waiting in the queue")
+HASHTAG_WATCH_PAGES = Counter(
+    "hashtag_watch_pages_total", "Upstream pages fetched by hashtag watches"
+)
+HASHTAG_WATCH_MEDIA = Counter("hashtag_watch_media_total", "New media found by hashtag watches")
+DOWNLOAD_SECONDS = Histogram(
+    "media_download_seconds",
+    "Time to stream one media asset to disk",
+    ["kind", "outcome"],
+    buckets=UPSTREAM_BUCKETS,
+)
+DOWNLOAD_BYTES = Counter("media_download_bytes_total", "Bytes downloaded from the CDN", ["kind"])
+DOWNLOAD_ASSETS = Counter(
+    "media_download_assets_total", "Downloaded assets by result", ["result"]
+)
+DOWNLOAD_QUEUE_DEPTH = Gauge("media_download_queue_depth", "Assets waiting for a download worker")
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Latency of SQL statements",
+    ["operation"],
+    buckets=DB_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Latency of API requests",
+    ["method", "route", "status"],
+    buckets=UPSTREAM_BUCKETS,
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels):
+    """Time the block and label it with its outcome: ok or the exception class"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+def session_event(session_id, event_name: str):
+    SESSION_EVENTS.labels(session=str(session_id), event=event_name).inc()
+
+
+def instrument_engine(engine):
+    """Record every SQL statement's latency, labelled by its verb"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        words = statement.split(None, 1)
+        operation = words[0].upper() if words else ""
+        DB_QUERY_SECONDS.labels(operation=operation).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
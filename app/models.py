@@ -1,9 +1,25 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    or_,
+)
+from sqlalchemy.orm import Session, deferred, object_session, relationship
 
+from app.config import TEMP_BLOCK_SECONDS
 from app.database import Base
+from app.metrics import session_event
 
 
 class InstagramPosts(Base):
@@ -13,9 +29,13 @@ class InstagramPosts(Base):
     session_id = Column(
         Integer, ForeignKey("instagram_sessions.id", ondelete="CASCADE"), nullable=True
     )
-    json_posts = Column(JSON, nullable=True)
+    # 정규화 이전 데이터; media 테이블로 대체되어 필요할 때만 로드
+    json_posts = deferred(Column(JSON, nullable=True))
     profile = Column(String(250), nullable=True)
     loading_time = Column(String(250), nullable=False)
+    # 증분 크롤링 기준점: 저장된 가장 최신 media
+    last_media_pk = Column(String(64), nullable=True)
+    last_taken_at = Column(DateTime, nullable=True)
     create_at = Column(DateTime, default=datetime.now())
 
     # رابطه با مدل InstagramSession
@@ -33,17 +53,334 @@ class InstagramPosts(Base):
         db_session.commit()
 
 
-def get_best_session(db: Session):
+class Media(Base):
+    """One Instagram media keyed by its pk"""
+
+    __tablename__ = "media"
+
+    pk = Column(String(64), primary_key=True)
+    media_id = Column(String(128), nullable=True)
+    code = Column(String(64), nullable=True, index=True)
+    profile = Column(String(250), nullable=True)
+    user_pk = Column(String(64), nullable=True)
+    taken_at = Column(DateTime, nullable=True)
+    media_type = Column(Integer, nullable=True)
+    caption = Column(Text, nullable=True)
+    like_count = Column(Integer, default=0)
+    comment_count = Column(Integer, default=0)
+    thumbnail_url = Column(Text, nullable=True)
+    video_url = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    resources = relationship(
+        "MediaResource",
+        back_populates="media",
+        order_by="MediaResource.position",
+        cascade="all, delete-orphan",
+    )
+    assets = relationship(
+        "MediaAsset",
+        back_populates="media",
+        order_by="[MediaAsset.position, MediaAsset.kind]",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (Index("ix_media_profile_taken_at", "profile", "taken_at"),)
+
+    def to_dict(self):
+        # 기존 json_posts 항목과 같은 형태를 유지
+        return {
+            "id": self.pk,
+            "code": self.code,
+            "taken_at": self.taken_at,
+            "caption": self.caption,
+            "likes": self.like_count,
+            "comments": self.comment_count,
+            "reels": str(self.video_url),
+            "type": self.media_type,
+            "imgs": [resource.to_dict() for resource in self.resources],
+            "assets": [asset.to_dict() for asset in self.assets if asset.status == "done"],
+        }
+
+
+class MediaResource(Base):
+    """A carousel item belonging to a Media"""
+
+    __tablename__ = "media_resources"
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_pk = Column(
+        String(64), ForeignKey("media.pk", ondelete="CASCADE"), nullable=False, index=True
+    )
+    position = Column(Integer, default=0)
+    pk = Column(String(64), nullable=True)
+    media_type = Column(Integer, nullable=True)
+    thumbnail_url = Column(Text, nullable=True)
+    video_url = Column(Text, nullable=True)
+
+    media = relationship("Media", back_populates="resources")
+
+    def to_dict(self):
+        return {
+            "thumbnail_url": str(
+                self.thumbnail_url if self.media_type == 1 else self.video_url
+            ),
+            "video_url": str(self.video_url),
+        }
+
+
+class MediaAsset(Base):
+    """A downloaded thumbnail or video of a media; files are shared by content hash"""
+
+    __tablename__ = "media_assets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    media_pk = Column(
+        String(64), ForeignKey("media.pk", ondelete="CASCADE"), nullable=False, index=True
+    )
+    # -1: media 자체의 썸네일/영상, 0 이상: carousel resource의 position
+    position = Column(Integer, nullable=False, default=-1)
+    kind = Column(String(16), nullable=False)
+    url = Column(Text, nullable=False)
+    sha256 = Column(String(64), nullable=True, index=True)
+    # MEDIA_DIR 기준 상대 경로
+    path = Column(String(512), nullable=True)
+    size = Column(Integer, nullable=True)
+    content_type = Column(String(128), nullable=True)
+    status = Column(String(16), nullable=False, default="pending")
+    error = Column(Text, nullable=True)
+    downloaded_at = Column(DateTime, nullable=True)
+
+    media = relationship("Media", back_populates="assets")
+
+    __table_args__ = (UniqueConstraint("media_pk", "position", "kind"),)
+
+    def to_dict(self):
+        return {
+            "position": self.position,
+            "kind": self.kind,
+            "sha256": self.sha256,
+            "path": self.path,
+            "size": self.size,
+            "content_type": self.content_type,
+            "file_url": f"/assets/{self.sha256}" if self.sha256 else None,
+        }
+
+
+class CrawlCheckpoint(Base):
+    """Where an unfinished profile crawl stopped, so the next run can resume"""
+
+    __tablename__ = "crawl_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    profile = Column(String(250), unique=True, index=True, nullable=False)
+    # 다음에 요청할 페이지의 커서
+    end_cursor = Column(Text, nullable=False)
+    pages_done = Column(Integer, default=0)
+    session_id = Column(
+        Integer, ForeignKey("instagram_sessions.id", ondelete="SET NULL"), nullable=True
+    )
+    # 중단된 크롤링이 본 가장 최신 media: 재개 시 이보다 새 게시물만 먼저 수집
+    head_pk = Column(String(64), nullable=True)
+    head_taken_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class HashtagWatch(Base):
+    """A hashtag polled in the background for media newer than the last one seen"""
+
+    __tablename__ = "hashtag_watches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hashtag = Column(String(250), unique=True, index=True, nullable=False)
+    is_active = Column(Boolean, default=True)
+    # 새 게시물이 많을수록 짧아지고 없으면 길어지는 현재 폴링 간격
+    interval_seconds = Column(Integer, nullable=False)
+    min_interval_seconds = Column(Integer, nullable=True)
+    max_interval_seconds = Column(Integer, nullable=True)
+    last_seen_pk = Column(String(64), nullable=True)
+    last_seen_taken_at = Column(DateTime, nullable=True)
+    last_polled_at = Column(DateTime, nullable=True)
+    next_poll_at = Column(DateTime, default=datetime.now, index=True)
+    last_new_count = Column(Integer, default=0)
+    last_pages = Column(Integer, default=0)
+    total_media = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class HashtagMedia(Base):
+    """Media found under a hashtag"""
+
+    __tablename__ = "hashtag_media"
+
+    hashtag = Column(String(250), primary_key=True)
+    media_pk = Column(
+        String(64), ForeignKey("media.pk", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    first_seen = Column(DateTime, default=datetime.now)
+
+
+class ProfileStats(Base):
+    """Running engagement totals of a profile, updated whenever its media are saved"""
+
+    __tablename__ = "profile_stats"
+
+    profile = Column(String(250), primary_key=True)
+    media_count = Column(Integer, default=0)
+    like_sum = Column(BigInteger, default=0)
+    comment_sum = Column(BigInteger, default=0)
+    # media_type 1: 사진, 2: 영상/릴스, 8: carousel
+    photo_count = Column(Integer, default=0)
+    video_count = Column(Integer, default=0)
+    album_count = Column(Integer, default=0)
+    first_taken_at = Column(DateTime, nullable=True)
+    last_taken_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        count = self.media_count or 0
+        span_days = None
+        if self.first_taken_at and self.last_taken_at:
+            span_days = (self.last_taken_at - self.first_taken_at).total_seconds() / 86400
+        return {
+            "username": self.profile,
+            "media_count": count,
+            "like_sum": self.like_sum or 0,
+            "comment_sum": self.comment_sum or 0,
+            "avg_likes": round((self.like_sum or 0) / count, 2) if count else 0.0,
+            "avg_comments": round((self.comment_sum or 0) / count, 2) if count else 0.0,
+            "media_types": {
+                "photo": self.photo_count or 0,
+                "video": self.video_count or 0,
+                "album": self.album_count or 0,
+            },
+            "first_taken_at": self.first_taken_at,
+            "last_taken_at": self.last_taken_at,
+            # 게시 주기: 게시물 사이 평균 간격과 주당 게시 수
+            "avg_interval_hours": (
+                round(span_days * 24 / (count - 1), 2) if span_days and count > 1 else None
+            ),
+            "posts_per_week": round(count * 7 / span_days, 2) if span_days else None,
+            "updated_at": self.updated_at,
+        }
+
+
+class ProfileStatsWeek(Base):
+    """Per-week media count and engagement of a profile"""
+
+    __tablename__ = "profile_stats_weeks"
+
+    profile = Column(String(250), primary_key=True)
+    # 해당 주의 월요일
+    week_start = Column(Date, primary_key=True)
+    media_count = Column(Integer, default=0)
+    like_sum = Column(BigInteger, default=0)
+    comment_sum = Column(BigInteger, default=0)
+
+    def to_dict(self):
+        return {
+            "week_start": self.week_start,
+            "media_count": self.media_count or 0,
+            "like_sum": self.like_sum or 0,
+            "comment_sum": self.comment_sum or 0,
+            "avg_likes": (
+                round((self.like_sum or 0) / self.media_count, 2) if self.media_count else 0.0
+            ),
+        }
+
+
+class ProfileIndex(Base):
+    """Known Instagram users, filled whenever a crawl or hashtag search sees one"""
+
+    __tablename__ = "profile_index"
+
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String(250), unique=True, index=True, nullable=False)
+    pk = Column(String(64), index=True, nullable=False)
+    full_name = Column(String(250), nullable=True)
+    media_count = Column(Integer, nullable=True)
+    last_seen = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class CacheEntry(Base):
+    """Persistent tier of the TTL cache"""
+
+    __tablename__ = "cache_entries"
+
+    key = Column(String(512), primary_key=True)
+    value = Column(JSON, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+def release_expired_temp_blocks(db: Session):
+    """Clear temporary blocks whose cooldown has expired
+
+    A block without an expiry (flagged before expiries existed, or set by hand)
+    gets one TEMP_BLOCK_SECONDS cooldown starting when it is first seen here.
+    """
+    now = datetime.now()
+    flagged = (
+        db.query(InstagramSession)
+        .filter(InstagramSession.is_temp_block == True)
+        .filter(
+            or_(
+                InstagramSession.temp_block_until == None,
+                InstagramSession.temp_block_until <= now,
+            )
+        )
+        .all()
+    )
+    released = 0
+    for session in flagged:
+        if session.temp_block_until is None:
+            session.temp_block_until = now + timedelta(seconds=TEMP_BLOCK_SECONDS)
+        else:
+            session.is_temp_block = False
+            session.temp_block_until = None
+            released += 1
+    # 바꿀 행이 있을 때만 쓰기 트랜잭션을 연다
+    if flagged:
+        db.commit()
+    return released
+
+
+def healthy_sessions_query(db: Session):
+    release_expired_temp_blocks(db)
     return (
         db.query(InstagramSession)
         .filter(InstagramSession.is_block == False)
         .filter(InstagramSession.is_challenge == False)
         .filter(InstagramSession.is_temp_block == False)
         .order_by(InstagramSession.number_of_use)
-        .first()
     )
 
 
+def get_best_session(db: Session):
+    return healthy_sessions_query(db).first()
+
+
+class Proxy(Base):
+    """An egress proxy and the result of its latest health probe"""
+
+    __tablename__ = "proxies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(512), unique=True, nullable=False)
+    # is_active: 관리자가 끈 프록시, is_healthy: 헬스 체크 결과
+    is_active = Column(Boolean, default=True)
+    is_healthy = Column(Boolean, default=True)
+    latency_ms = Column(Integer, nullable=True)
+    failures = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    last_checked = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    sessions = relationship("InstagramSession", back_populates="proxy")
+
+
 class InstagramSession(Base):
     __tablename__ = "instagram_sessions"
 
@@ -55,10 +392,14 @@ class InstagramSession(Base):
     is_block = Column(Boolean, default=False)
     is_challenge = Column(Boolean, default=False)
     is_temp_block = Column(Boolean, default=False)
+    temp_block_until = Column(DateTime, nullable=True)
     number_of_use = Column(Integer, default=0)
+    # 세션마다 고정된 프록시 (건강하지 않으면 다른 프록시로 재배정)
+    proxy_id = Column(Integer, ForeignKey("proxies.id", ondelete="SET NULL"), nullable=True)
 
     # رابطه با مدل InstagramPosts
     posts = relationship("InstagramPosts", back_populates="session")
+    proxy = relationship("Proxy", back_populates="sessions")
 
     def increment_use(self, db: Session):
         try:
@@ -70,4 +411,32 @@ class InstagramSession(Base):
             db.refresh(self)
         except Exception as e:
             db.rollback()  # در صورت وقوع خطا، تراکنش را به حالت قبل برگردانید
-            raise e  # خطا را مجدداً برانگیزید تا در بخش‌های دیگر مدیریت شود
\ No newline at end of file
+            raise e  # خطا را مجدداً برانگیزید تا در بخش‌های دیگر مدیریت شود
+
+    def _save_flags(self, **flags):
+        for key, value in flags.items():
+            setattr(self, key, value)
+        db = object_session(self)
+        if db is None:
+            return
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    def block(self):
+        session_event(self.id, "blocked")
+        self._save_flags(is_block=True)
+
+    def hit_challenge(self):
+        session_event(self.id, "challenge")
+        self._save_flags(is_challenge=True)
+
+    def temp_block(self, seconds: int = TEMP_BLOCK_SECONDS):
+        session_event(self.id, "temp_blocked")
+        # 쿨다운이 지나면 get_best_session에서 자동으로 해제됨
+        self._save_flags(
+            is_temp_block=True,
+            temp_block_until=datetime.now() + timedelta(seconds=seconds),
+        )
@@ -0,0 +1,19 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(taken_at: datetime, pk: str) -> str:
+    """Build an opaque cursor from the last item of a page"""
+    raw = json.dumps([taken_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (taken_at, pk) from a cursor, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        taken_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(taken_at), str(pk)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
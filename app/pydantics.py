@@ -1,11 +1,15 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class BaseProfile(BaseModel):
     username: str
+    # 마지막으로 저장된 media에서 크롤링을 멈춤
+    incremental: bool = True
+    # 썸네일/영상 파일 다운로드 (None이면 DOWNLOAD_MEDIA 설정을 따름)
+    download_media: Optional[bool] = None
 
 
 class InstagramPostResponse(BaseModel):
@@ -18,14 +22,64 @@ class InstagramPostResponse(BaseModel):
         orm_mode = True
 
 
+class BatchProfiles(BaseModel):
+    usernames: List[str] = Field(..., min_length=1)
+    # 값이 클수록 먼저 실행
+    priority: int = 0
+    incremental: bool = True
+    download_media: Optional[bool] = None
+
+
+class CrawlJobResponse(BaseModel):
+    id: str
+    username: str
+    incremental: bool
+    download_media: Optional[bool] = None
+    priority: int
+    batch_id: Optional[str]
+    status: str
+    pages_fetched: int
+    media_count: int
+    new_media: int
+    errors: List[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class CrawlBatchFailure(BaseModel):
+    job_id: str
+    username: str
+    errors: List[str]
+
+
+class CrawlBatchResponse(BaseModel):
+    id: str
+    priority: int
+    total: int
+    queued: int
+    running: int
+    success: int
+    failed: int
+    progress: float
+    pages_fetched: int
+    media_count: int
+    new_media: int
+    failures: List[CrawlBatchFailure]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+
 class InstagramSessionResponse(BaseModel):
     id: int
     username: str
     is_block: bool
     is_challenge: bool
     is_temp_block: bool
+    temp_block_until: Optional[datetime] = None
     number_of_use: int
     session_data: dict
+    proxy_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -36,5 +90,163 @@ class InstagramSessionUpdate(BaseModel):
     is_block: Optional[bool] = None
     is_challenge: Optional[bool] = None
     is_temp_block: Optional[bool] = None
+    temp_block_until: Optional[datetime] = None
     number_of_use: Optional[int] = None
     session_data: Optional[dict] = None
+
+
+class PacingEntry(BaseModel):
+    session_id: int
+    endpoint: str
+    rate_per_hour: float
+    effective_per_hour: float
+    tokens: float
+    requests: int
+    throttled: int
+    retries: int
+
+
+class SessionPoolEntry(BaseModel):
+    id: int
+    username: str
+    healthy: bool
+    leases: int
+    tokens: float
+    capacity: int
+    effective_per_hour: float
+    endpoints: List[PacingEntry]
+    temp_block_until: Optional[datetime]
+    number_of_use: int
+
+
+class CacheStats(BaseModel):
+    entries: int
+    inflight: int
+    hits: int
+    misses: int
+
+
+class SessionPoolResponse(BaseModel):
+    total: int
+    healthy: int
+    leased: int
+    waiting: int
+    utilization: float
+    requests_per_hour: float
+    effective_per_hour: float
+    sessions: List[SessionPoolEntry]
+    cache: CacheStats
+
+
+class ProxyCreate(BaseModel):
+    url: str = Field(..., min_length=1)
+
+
+class ProxyUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_healthy: Optional[bool] = None
+
+
+class ProxyResponse(BaseModel):
+    id: int
+    url: str
+    is_active: bool
+    is_healthy: bool
+    latency_ms: Optional[int] = None
+    failures: int
+    last_error: Optional[str] = None
+    last_checked: Optional[datetime] = None
+    sessions: int = 0
+
+
+class ProxyCheckResult(BaseModel):
+    id: int
+    url: str
+    healthy: bool
+    latency_ms: Optional[int] = None
+    error: Optional[str] = None
+
+
+class MediaAssetResponse(BaseModel):
+    media_pk: str
+    position: int
+    kind: str
+    url: str
+    status: str
+    sha256: Optional[str] = None
+    path: Optional[str] = None
+    size: Optional[int] = None
+    content_type: Optional[str] = None
+    error: Optional[str] = None
+    downloaded_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class HashtagWatchCreate(BaseModel):
+    hashtag: str = Field(..., min_length=1)
+    # 비워두면 HASHTAG_WATCH_MIN_INTERVAL / HASHTAG_WATCH_MAX_INTERVAL 사용
+    min_interval_seconds: Optional[int] = Field(default=None, ge=1)
+    max_interval_seconds: Optional[int] = Field(default=None, ge=1)
+
+
+class HashtagWatchUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    min_interval_seconds: Optional[int] = Field(default=None, ge=1)
+    max_interval_seconds: Optional[int] = Field(default=None, ge=1)
+
+
+class HashtagWatchResponse(BaseModel):
+    id: int
+    hashtag: str
+    is_active: bool
+    interval_seconds: int
+    min_interval_seconds: Optional[int] = None
+    max_interval_seconds: Optional[int] = None
+    last_seen_pk: Optional[str] = None
+    last_seen_taken_at: Optional[datetime] = None
+    last_polled_at: Optional[datetime] = None
+    next_poll_at: Optional[datetime] = None
+    last_new_count: int = 0
+    last_pages: int = 0
+    total_media: int = 0
+    last_error: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProfileStatsWeekResponse(BaseModel):
+    week_start: date
+    media_count: int
+    like_sum: int
+    comment_sum: int
+    avg_likes: float
+
+
+class ProfileStatsResponse(BaseModel):
+    username: str
+    media_count: int
+    like_sum: int
+    comment_sum: int
+    avg_likes: float
+    avg_comments: float
+    media_types: Dict[str, int]
+    first_taken_at: Optional[datetime] = None
+    last_taken_at: Optional[datetime] = None
+    avg_interval_hours: Optional[float] = None
+    posts_per_week: Optional[float] = None
+    updated_at: Optional[datetime] = None
+    weeks: List[ProfileStatsWeekResponse] = []
+
+
+class BatchStatsRequest(BaseModel):
+    usernames: List[str] = Field(..., min_length=1)
+    # 프로필마다 포함할 최근 주 수 (0이면 합계만)
+    weeks: int = Field(default=0, ge=0)
+
+
+class BatchStatsResponse(BaseModel):
+    profiles: List[ProfileStatsResponse]
+    missing: List[str]
@@ -0,0 +1,131 @@
+import logging
+import re
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, cast, column, func, inspect, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import SEARCH_TS_CONFIG
+from app.models import Media
+
+logger = logging.getLogger(__name__)
+
+# SQLite: caption만 색인하는 contentless FTS5 테이블, rowid = 숫자 media pk
+media_fts = table("media_fts", column("rowid"), column("caption"))
+
+SQLITE_FTS_TABLE = """CREATE VIRTUAL TABLE media_fts USING fts5(
+    caption, content='', tokenize='unicode61 remove_diacritics 2'
+)"""
+SQLITE_FTS_TRIGGERS = [
+    # contentless 테이블은 삭제할 때 색인했던 원래 값을 넘겨야 함
+    """CREATE TRIGGER IF NOT EXISTS media_fts_insert AFTER INSERT ON media
+    WHEN new.caption IS NOT NULL AND new.pk NOT GLOB '*[^0-9]*' BEGIN
+        INSERT INTO media_fts(rowid, caption) VALUES (CAST(new.pk AS INTEGER), new.caption);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS media_fts_delete AFTER DELETE ON media
+    WHEN old.caption IS NOT NULL AND old.pk NOT GLOB '*[^0-9]*' BEGIN
+        INSERT INTO media_fts(media_fts, rowid, caption)
+        VALUES ('delete', CAST(old.pk AS INTEGER), old.caption);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS media_fts_update AFTER UPDATE OF caption ON media
+    WHEN old.caption IS NOT new.caption AND new.pk NOT GLOB '*[^0-9]*' BEGIN
+        INSERT INTO media_fts(media_fts, rowid, caption)
+        SELECT 'delete', CAST(old.pk AS INTEGER), old.caption WHERE old.caption IS NOT NULL;
+        INSERT INTO media_fts(rowid, caption)
+        SELECT CAST(new.pk AS INTEGER), new.caption WHERE new.caption IS NOT NULL;
+    END""",
+]
+SQLITE_FTS_BACKFILL = """INSERT INTO media_fts(rowid, caption)
+    SELECT CAST(pk AS INTEGER), caption FROM media
+    WHERE caption IS NOT NULL AND pk NOT GLOB '*[^0-9]*'"""
+
+# PostgreSQL: 생성 컬럼 tsvector + GIN 인덱스
+POSTGRES_FTS_DDL = [
+    f"""ALTER TABLE media ADD COLUMN IF NOT EXISTS caption_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('{SEARCH_TS_CONFIG}', coalesce(caption, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_media_caption_tsv ON media USING gin (caption_tsv)",
+]
+
+
+def install_search_index(engine):
+    """Create the caption full-text index and the triggers that keep it current"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            if not inspect(conn).has_table("media_fts"):
+                conn.execute(text(SQLITE_FTS_TABLE))
+                # 색인 도입 이전에 저장된 media
+                conn.execute(text(SQLITE_FTS_BACKFILL))
+            for statement in SQLITE_FTS_TRIGGERS:
+                conn.execute(text(statement))
+        elif dialect == "postgresql":
+            for statement in POSTGRES_FTS_DDL:
+                conn.execute(text(statement))
+        else:
+            logger.warning(f"No full-text index for {dialect}; caption search will scan")
+
+
+def fts5_query(q: str) -> str:
+    """Turn user input into an FTS5 query: every word must match, `word*` is a prefix"""
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = re.sub(r'["*]', "", word)
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+async def search_media(
+    db: AsyncSession,
+    q: str,
+    profile: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: str = "relevance",
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Return [(Media, score)] matching q, best match (or newest) first"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = fts5_query(q)
+        if not match:
+            return []
+        # bm25는 낮을수록 관련도가 높음
+        rank = func.bm25(literal_column("media_fts"))
+        query = (
+            select(Media, (-rank).label("score"))
+            .select_from(media_fts)
+            .join(Media, Media.pk == cast(media_fts.c.rowid, String))
+            .where(literal_column("media_fts").op("MATCH")(match))
+        )
+        relevance = rank.asc()
+    elif dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(SEARCH_TS_CONFIG, q)
+        tsv = literal_column("media.caption_tsv")
+        rank = func.ts_rank(tsv, tsquery)
+        query = select(Media, rank.label("score")).where(tsv.op("@@")(tsquery))
+        relevance = rank.desc()
+    else:
+        query = select(Media, literal_column("0").label("score")).where(
+            Media.caption.ilike(f"%{q}%")
+        )
+        relevance = Media.taken_at.desc()
+
+    if profile:
+        query = query.where(Media.profile == profile)
+    if since:
+        query = query.where(Media.taken_at >= since)
+    if until:
+        query = query.where(Media.taken_at < until)
+    order = (relevance,) if sort == "relevance" else ()
+    rows = await db.execute(
+        query.options(selectinload(Media.resources), selectinload(Media.assets))
+        .order_by(*order, Media.taken_at.desc(), Media.pk.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return rows.all()
@@ -0,0 +1,10 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(obj) -> str:
+    """Serialize one record as a newline-delimited JSON line"""
+    return json.dumps(jsonable_encoder(obj), ensure_ascii=False) + "\n"
@@ -0,0 +1,44 @@
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scraper.downloads import media_downloader
+
+from ..dependencies import get_async_db
+from ..models import Media, MediaAsset
+from ..pydantics import MediaAssetResponse
+
+router = APIRouter()
+
+
+@router.get("/media/{media_pk}/assets", response_model=List[MediaAssetResponse])
+async def get_media_assets(media_pk: str, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(Media, media_pk) is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    assets = await db.scalars(
+        select(MediaAsset)
+        .where(MediaAsset.media_pk == media_pk)
+        .order_by(MediaAsset.position, MediaAsset.kind)
+    )
+    return assets.all()
+
+
+@router.get("/assets/{sha256}")
+async def get_asset_file(sha256: str, db: AsyncSession = Depends(get_async_db)):
+    asset = (
+        await db.execute(
+            select(MediaAsset.path, MediaAsset.content_type)
+            .where(MediaAsset.sha256 == sha256, MediaAsset.status == "done")
+            .limit(1)
+        )
+    ).first()
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    path = media_downloader.path_for(asset.path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Asset file is missing")
+    return FileResponse(path, media_type=asset.content_type)
@@ -1,15 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import asyncio
 import logging
-import time
-from instagrapi.exceptions import ChallengeRequired, LoginRequired
+from instagrapi.exceptions import (
+    ChallengeRequired,
+    ClientConnectionError,
+    FeedbackRequired,
+    LoginRequired,
+    PleaseWaitFewMinutes,
+    RateLimitError,
+)
 
-from app.database import get_db
-from app.models import get_best_session
-from instagrapi import Client
-from pydantic import BaseModel
+from app.config import (
+    CACHE_TTL_HASHTAG,
+    DOWNLOAD_MEDIA,
+    FEEDBACK_BLOCK_SECONDS,
+    HASHTAG_SESSION_CONCURRENCY,
+    HASHTAG_SESSION_CONCURRENCY_MAX,
+    TEMP_BLOCK_SECONDS,
+)
+from app.database import SessionLocal
+from app.metrics import session_event
+from app.models import InstagramSession
+from app.streaming import NDJSON_MEDIA_TYPE, ndjson_line
+from pydantic import BaseModel, Field
+from scraper.cache import cache
+from scraper.client_pool import client_pool
+from scraper.downloads import media_downloader
+from scraper.fanout import HashtagFanout, classify_error, load_healthy_sessions
+from scraper.profiles import remember_users
+from scraper.proxies import proxy_pool
+from scraper.scheduler import session_scheduler
+from scraper.storage import link_hashtag_medias, save_medias
+from scraper.watches import normalize_hashtag
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +51,8 @@ class HashtagSearchRequest(BaseModel):
     Attributes:
         hashtags (List[str]): List of hashtags to search (without # symbol)
         amount_per_tag (int): Number of recent posts to fetch per hashtag (default: 20)
+        per_session_concurrency (int): Concurrent requests per Instagram session
+            (1 to HASHTAG_SESSION_CONCURRENCY_MAX)
     
     Example:
         {
@@ -34,147 +62,270 @@ class HashtagSearchRequest(BaseModel):
     """
     hashtags: List[str]
     amount_per_tag: Optional[int] = 20
+    per_session_concurrency: Optional[int] = Field(
+        default=HASHTAG_SESSION_CONCURRENCY, ge=1, le=HASHTAG_SESSION_CONCURRENCY_MAX
+    )
 
-@router.post("/hashtags/search")
-def search_multiple_hashtags(
-    request: HashtagSearchRequest,
-    db: Session = Depends(get_db)
-):
-    """Search multiple hashtags simultaneously"""
-    logger.info(f"Received search request - hashtags: {request.hashtags}, amount_per_tag: {request.amount_per_tag}")
-    
-    session = get_best_session(db)
-    if not session:
-        logger.warning("No valid session found")
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "status": "error",
-                "code": "NO_SESSION",
-                "message": "No valid Instagram session found. Please login first."
-            }
+
+def _no_session_error():
+    logger.warning("No valid session found")
+    return HTTPException(
+        status_code=400,
+        detail={
+            "status": "error",
+            "code": "NO_SESSION",
+            "message": "No valid Instagram session found. Please login first."
+        }
+    )
+
+
+def _hashtag_fetcher(amount: int):
+    """Build the per-hashtag fetch callable run by the fan-out workers"""
+    def load(hashtag: str, client, session):
+        # 작업 스레드마다 별도 DB 세션 사용
+        db = SessionLocal()
+        try:
+            return fetch_hashtag(hashtag, amount, client, session, db)
+        finally:
+            db.close()
+
+    def fetch(hashtag: str, client, session):
+        # 동일한 해시태그 요청은 한 번만 업스트림으로 보냄
+        return cache.get_or_load(
+            _hashtag_cache_key(hashtag, amount),
+            lambda: load(hashtag, client, session),
+            CACHE_TTL_HASHTAG,
+            should_cache=lambda result: result["status"] == "success",
         )
+    return fetch
+
 
-    client = Client()
-    client.set_settings(session.session_data)
-    client.request_timeout = 5
+def _hashtag_cache_key(hashtag: str, amount: int) -> str:
+    return f"hashtag:{hashtag.lower()}:{amount}"
 
-    def fetch_hashtag(hashtag: str):
+
+def _cached_results(hashtags: List[str], amount: int):
+    """Split hashtags into cached results and the ones that still need a fetch"""
+    cached, missing = [], []
+    for hashtag in hashtags:
+        result = cache.get(_hashtag_cache_key(hashtag, amount))
+        if result is None:
+            missing.append(hashtag)
+        else:
+            cached.append(result)
+    return cached, missing
+
+
+def media_to_dict(media):
+    return {
+        "pk": str(media.pk),
+        "id": media.id,
+        "code": media.code,
+        "taken_at": media.taken_at,
+        "media_type": media.media_type,
+        "thumbnail_url": str(media.thumbnail_url),
+        "caption_text": media.caption_text,
+        "like_count": media.like_count,
+        "comment_count": media.comment_count,
+        "user": {
+            "pk": media.user.pk,
+            "username": media.user.username,
+            "full_name": media.user.full_name,
+            "profile_pic_url": str(media.user.profile_pic_url)
+        },
+        "url": f"https://www.instagram.com/p/{media.code}/",
+        "taken_at_formatted": media.taken_at.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def fetch_hashtag(hashtag: str, amount: int, client, session, db: Session):
+    try:
+        logger.info(f"Fetching posts for hashtag: {hashtag}")
+
+        medias = session_scheduler.call(
+            session.id,
+            "hashtag",
+            client.hashtag_medias_recent,
+            name=hashtag,
+            amount=amount,
+        )
+        medias.sort(key=lambda x: x.taken_at, reverse=True)
+        # 결과를 공유 media 저장소와 해시태그 링크, 프로필 인덱스에 기록
         try:
-            logger.info(f"Fetching posts for hashtag: {hashtag}")
-            time.sleep(2)
-            
-            medias = client.hashtag_medias_recent(
-                name=hashtag,
-                amount=request.amount_per_tag
-            )
-            medias.sort(key=lambda x: x.taken_at, reverse=True)
-            
-            logger.info(f"Successfully fetched {len(medias)} posts for hashtag: {hashtag}")
-            return {
-                "status": "success",
-                "hashtag": hashtag,
-                "count": len(medias),
-                "posts": [
-                    {
-                        "id": media.id,
-                        "code": media.code,
-                        "taken_at": media.taken_at,
-                        "media_type": media.media_type,
-                        "thumbnail_url": str(media.thumbnail_url),
-                        "caption_text": media.caption_text,
-                        "like_count": media.like_count,
-                        "comment_count": media.comment_count,
-                        "user": {
-                            "pk": media.user.pk,
-                            "username": media.user.username,
-                            "full_name": media.user.full_name,
-                            "profile_pic_url": str(media.user.profile_pic_url)
-                        },
-                        "url": f"https://www.instagram.com/p/{media.code}/",
-                        "taken_at_formatted": media.taken_at.strftime("%Y-%m-%d %H:%M:%S")
-                    } for media in medias
-                ]
-            }
-            
-        except (ChallengeRequired, LoginRequired) as e:
-            logger.error(f"Challenge/Login required for hashtag {hashtag}: {str(e)}")
-            
-            # Update session status using PUT endpoint
-            session_update = {
-                "username": session.username,
-                "is_block": True,
-                "is_challenge": True,
-                "is_temp_block": False,
-                "number_of_use": session.number_of_use,
-                "session_data": session.session_data
-            }
-            
-            try:
-                # Update session status
-                db.query(InstagramSession).filter(InstagramSession.id == session.id).update(session_update)
-                db.commit()
-                logger.info(f"Session {session.id} marked as blocked and challenged")
-            except Exception as db_error:
-                logger.error(f"Failed to update session status: {str(db_error)}")
-                db.rollback()
-
-            # Extract phone number from error message
-            error_msg = str(e)
-            phone_number = None
-            if "'phone_number':" in error_msg:
-                try:
-                    import json
-                    import re
-                    json_str = re.search(r'\{.*\}', error_msg).group()
-                    data = json.loads(json_str)
-                    phone_number = data.get('step_data', {}).get('phone_number')
-                except:
-                    pass
-
-            return {
-                "status": "error",
-                "hashtag": hashtag,
-                "error": str(e),
-                "error_type": "challenge",
-                "challenge_info": {
-                    "type": "phone_verification",
-                    "phone_number": phone_number,
-                    "message": "Please verify your account through SMS"
-                },
-                "posts": []
-            }
-        except Exception as e:
-            logger.error(f"Error fetching hashtag {hashtag}: {str(e)}")
-            
-            # Update session status for other errors
-            session_update = {
-                "username": session.username,
-                "is_block": False,
-                "is_challenge": False,
-                "is_temp_block": True,  # Temporary block for other errors
-                "number_of_use": session.number_of_use + 1,
-                "session_data": session.session_data
-            }
-            
+            save_medias(db, medias, commit=False)
+            link_hashtag_medias(db, normalize_hashtag(hashtag), [media.pk for media in medias])
+            remember_users(db, [media.user for media in medias], commit=False)
+            db.commit()
+            if DOWNLOAD_MEDIA:
+                media_downloader.enqueue(db, medias)
+        except Exception as db_error:
+            logger.error(f"Failed to store hashtag results: {str(db_error)}")
+            db.rollback()
+        
+        logger.info(f"Successfully fetched {len(medias)} posts for hashtag: {hashtag}")
+        return {
+            "status": "success",
+            "hashtag": hashtag,
+            "count": len(medias),
+            "posts": [media_to_dict(media) for media in medias]
+        }
+        
+    except (ChallengeRequired, LoginRequired) as e:
+        logger.error(f"Challenge/Login required for hashtag {hashtag}: {str(e)}")
+        client_pool.evict(session.id)
+        session_event(session.id, "challenge")
+        
+        # Update session status using PUT endpoint
+        session_update = {
+            "username": session.username,
+            "is_block": True,
+            "is_challenge": True,
+            "is_temp_block": False,
+            "number_of_use": session.number_of_use,
+            "session_data": session.session_data
+        }
+        
+        try:
+            # Update session status
+            db.query(InstagramSession).filter(InstagramSession.id == session.id).update(session_update)
+            db.commit()
+            logger.info(f"Session {session.id} marked as blocked and challenged")
+        except Exception as db_error:
+            logger.error(f"Failed to update session status: {str(db_error)}")
+            db.rollback()
+
+        # Extract phone number from error message
+        error_msg = str(e)
+        phone_number = None
+        if "'phone_number':" in error_msg:
             try:
-                db.query(InstagramSession).filter(InstagramSession.id == session.id).update(session_update)
-                db.commit()
-                logger.info(f"Session {session.id} marked as temporarily blocked")
-            except Exception as db_error:
-                logger.error(f"Failed to update session status: {str(db_error)}")
-                db.rollback()
-
-            return {
-                "status": "error",
-                "hashtag": hashtag,
-                "error": str(e),
-                "posts": []
-            }
-
-    # 병렬로 해시태그 검색 실행
-    with ThreadPoolExecutor(max_workers=min(len(request.hashtags), 2)) as executor:
-        results = list(executor.map(fetch_hashtag, request.hashtags))
+                import json
+                import re
+                json_str = re.search(r'\{.*\}', error_msg).group()
+                data = json.loads(json_str)
+                phone_number = data.get('step_data', {}).get('phone_number')
+            except:
+                pass
+
+        return {
+            "status": "error",
+            "hashtag": hashtag,
+            "error": str(e),
+            "error_type": "challenge",
+            "challenge_info": {
+                "type": "phone_verification",
+                "phone_number": phone_number,
+                "message": "Please verify your account through SMS"
+            },
+            "posts": []
+        }
+    except ClientConnectionError as e:
+        # 프록시 문제는 계정을 막지 않고 프록시 실패로만 기록
+        logger.error(f"Connection error for hashtag {hashtag}: {str(e)}")
+        proxy_pool.report_failure(session.proxy_id, e)
+        return {
+            "status": "error",
+            "hashtag": hashtag,
+            "error": str(e),
+            "error_type": "connection",
+            "posts": []
+        }
+    except (FeedbackRequired, PleaseWaitFewMinutes, RateLimitError) as e:
+        logger.error(f"Session {session.id} limited while fetching hashtag {hashtag}: {str(e)}")
+        session_event(session.id, "temp_blocked")
+        block_seconds = FEEDBACK_BLOCK_SECONDS if isinstance(e, FeedbackRequired) else TEMP_BLOCK_SECONDS
+        
+        # Update session status for rate limits and feedback blocks
+        session_update = {
+            "username": session.username,
+            "is_block": False,
+            "is_challenge": False,
+            "is_temp_block": True,
+            "temp_block_until": datetime.now() + timedelta(seconds=block_seconds),
+            "number_of_use": session.number_of_use + 1,
+            "session_data": session.session_data
+        }
+        
+        try:
+            db.query(InstagramSession).filter(InstagramSession.id == session.id).update(session_update)
+            db.commit()
+            logger.info(f"Session {session.id} marked as temporarily blocked")
+        except Exception as db_error:
+            logger.error(f"Failed to update session status: {str(db_error)}")
+            db.rollback()
+
+        return {
+            "status": "error",
+            "hashtag": hashtag,
+            "error": str(e),
+            "error_type": classify_error(e),
+            "posts": []
+        }
+    except Exception as e:
+        # 해시태그 자체의 오류 (없는 태그 등)는 세션 상태를 바꾸지 않음
+        logger.error(f"Error fetching hashtag {hashtag}: {str(e)}")
+        return {
+            "status": "error",
+            "hashtag": hashtag,
+            "error": str(e),
+            "posts": []
+        }
+
+
+def _media_key(post):
+    # 이전 버전 캐시 항목에는 pk가 없음
+    return post.get("pk") or str(post["id"]).split("_")[0]
+
+
+def _taken_at(post):
+    # DB 캐시에서 읽은 결과는 jsonable_encoder를 거쳐 ISO 문자열로 저장돼 있음
+    value = post["taken_at"]
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _merge_results(results):
+    """Collapse per-hashtag results into unique medias with the tags that matched them"""
+    medias = {}
+    summaries = []
+    for result in results:
+        summary = {k: v for k, v in result.items() if k != "posts"}
+        summary["media_pks"] = []
+        for post in result.get("posts", []):
+            key = _media_key(post)
+            media = medias.get(key)
+            if media is None:
+                media = medias[key] = {**post, "tags": []}
+            if result["hashtag"] not in media["tags"]:
+                media["tags"].append(result["hashtag"])
+            summary["media_pks"].append(key)
+        summaries.append(summary)
+    return summaries, sorted(medias.values(), key=_taken_at, reverse=True)
+
+
+@router.post("/hashtags/search")
+async def search_multiple_hashtags(request: HashtagSearchRequest):
+    """Search multiple hashtags simultaneously across all healthy sessions"""
+    logger.info(f"Received search request - hashtags: {request.hashtags}, amount_per_tag: {request.amount_per_tag}")
+
+    results, missing = _cached_results(request.hashtags, request.amount_per_tag)
+    if missing:
+        sessions = await asyncio.to_thread(load_healthy_sessions)
+        if not sessions:
+            raise _no_session_error()
+
+        # 세션별 동시성 제한을 두고 모든 세션에 해시태그를 분산
+        fanout = HashtagFanout(request.per_session_concurrency or HASHTAG_SESSION_CONCURRENCY)
+        try:
+            results += [
+                result
+                async for result in fanout.run(
+                    missing, _hashtag_fetcher(request.amount_per_tag), sessions
+                )
+            ]
+        except ValueError:
+            raise _no_session_error()
+    order = {hashtag: index for index, hashtag in enumerate(request.hashtags)}
+    results.sort(key=lambda result: order.get(result["hashtag"], 0))
 
     # 모든 결과가 에러인지 확인
     all_failed = all(result.get("status") == "error" for result in results)
@@ -207,7 +358,60 @@ def search_multiple_hashtags(
             )
 
     # 일부 성공한 경우만 여기에 도달
+    # 여러 해시태그에 걸린 media는 한 번만 내려보내고 tags로 구분
+    summaries, medias = _merge_results(results)
     return {
         "status": "partial_success" if any(result.get("status") == "error" for result in results) else "success",
-        "results": results
-    }
\ No newline at end of file
+        "results": summaries,
+        "medias": medias,
+    }
+
+
+@router.post("/hashtags/search/stream")
+async def stream_multiple_hashtags(request: HashtagSearchRequest):
+    """Search multiple hashtags and stream one media per NDJSON line as each tag finishes
+
+    A media already sent for an earlier hashtag is sent again only as a short
+    {"hashtag", "pk", "duplicate": true} line.
+    """
+    logger.info(f"Received stream request - hashtags: {request.hashtags}, amount_per_tag: {request.amount_per_tag}")
+
+    cached, missing = _cached_results(request.hashtags, request.amount_per_tag)
+    sessions = []
+    if missing:
+        sessions = await asyncio.to_thread(load_healthy_sessions)
+        if not sessions:
+            raise _no_session_error()
+
+    fanout = HashtagFanout(request.per_session_concurrency or HASHTAG_SESSION_CONCURRENCY)
+
+    sent = set()
+
+    def lines(result):
+        if result["status"] == "error":
+            yield ndjson_line({k: v for k, v in result.items() if k != "posts"})
+            return
+        for post in result["posts"]:
+            key = _media_key(post)
+            if key in sent:
+                yield ndjson_line({"hashtag": result["hashtag"], "pk": key, "duplicate": True})
+                continue
+            sent.add(key)
+            yield ndjson_line({"hashtag": result["hashtag"], **post})
+
+    async def generate():
+        for result in cached:
+            for line in lines(result):
+                yield line
+        if not missing:
+            return
+        try:
+            async for result in fanout.run(
+                missing, _hashtag_fetcher(request.amount_per_tag), sessions
+            ):
+                for line in lines(result):
+                    yield line
+        except ValueError as e:
+            yield ndjson_line({"status": "error", "code": "NO_SESSION", "error": str(e)})
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+
+from scraper.jobs import crawl_queue
+
+from ..pydantics import CrawlBatchResponse, CrawlJobResponse
+
+router = APIRouter()
+
+
+@router.get("/jobs/batches/{batch_id}", response_model=CrawlBatchResponse)
+async def get_batch(batch_id: str):
+    batch = crawl_queue.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=CrawlJobResponse)
+async def get_job(job_id: str):
+    job = crawl_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -1,19 +1,35 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-
-from scraper.posts import fetch_instagram_data
-
-from ..dependencies import get_db
-from ..models import InstagramPosts
-from ..pydantics import BaseProfile, InstagramPostResponse
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from scraper.jobs import crawl_queue
+
+from ..config import EXPORT_BATCH_SIZE
+from ..database import SessionLocal
+from ..dependencies import get_async_db, get_db
+from ..models import (
+    CrawlCheckpoint,
+    InstagramPosts,
+    Media,
+    MediaAsset,
+    MediaResource,
+    ProfileStats,
+    ProfileStatsWeek,
+)
+from ..pagination import decode_cursor, encode_cursor
+from ..pydantics import BaseProfile, BatchProfiles, InstagramPostResponse
+from ..streaming import NDJSON_MEDIA_TYPE, ndjson_line
 
 router = APIRouter()
 
 @router.get("/posts/", response_model=List[InstagramPostResponse])
-async def get_all_posts(db: Session = Depends(get_db)):
-    posts = db.query(InstagramPosts).all()
+async def get_all_posts(db: AsyncSession = Depends(get_async_db)):
+    posts = (await db.scalars(select(InstagramPosts))).all()
     if not posts:
         raise HTTPException(status_code=404, detail="No posts found")
     return posts
@@ -21,71 +37,209 @@ async def get_all_posts(db: Session = Depends(get_db)):
 
 
 @router.get("/posts/{profile_profile}")
-def get_profile(
+async def get_profile(
     profile_profile: str,
     limit: int = Query(default=10, ge=1),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(default=None),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    profile = (
-        db.query(InstagramPosts)
-        .filter(InstagramPosts.profile == profile_profile)
-        .first()
+    profile = await db.scalar(
+        select(InstagramPosts).where(InstagramPosts.profile == profile_profile).limit(1)
     )
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
-    posts = profile.json_posts
+    query = select(Media).where(Media.profile == profile_profile)
+    if since:
+        query = query.where(Media.taken_at >= since)
+    if until:
+        query = query.where(Media.taken_at < until)
+
+    if cursor:
+        # 커서 모드: (taken_at, pk) 기준 keyset 페이지네이션
+        try:
+            taken_at, pk = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            or_(
+                Media.taken_at < taken_at,
+                and_(Media.taken_at == taken_at, Media.pk < pk),
+            )
+        )
+        total_posts = None
+        offset = None
+    else:
+        total_posts = await db.scalar(
+            select(func.count()).select_from(query.subquery())
+        )
+        if not total_posts and not (since or until):
+            return await _legacy_profile_posts(db, profile, limit, offset)
+
+    medias = (
+        await db.scalars(
+            query.options(selectinload(Media.resources), selectinload(Media.assets))
+            .order_by(Media.taken_at.desc(), Media.pk.desc())
+            .limit(limit + 1)
+            .offset(offset)
+        )
+    ).all()
+    next_cursor = None
+    if len(medias) > limit:
+        medias = medias[:limit]
+        next_cursor = encode_cursor(medias[-1].taken_at, medias[-1].pk)
+
+    return {
+        "id": profile.id,
+        "username": profile_profile,
+        "posts": [media.to_dict() for media in medias],
+        "total_posts": total_posts,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+    }
+
+
+async def _legacy_profile_posts(
+    db: AsyncSession, profile: InstagramPosts, limit: int, offset: int
+):
+    # 정규화 이전에 저장된 json_posts 데이터 (deferred 컬럼이라 따로 조회)
+    posts = await db.scalar(
+        select(InstagramPosts.json_posts).where(InstagramPosts.id == profile.id)
+    )
+    posts = posts or []
     if isinstance(posts, str):
         import json
 
         posts = json.loads(posts)
 
-    paginated_posts = posts[offset : offset + limit]
-
     return {
         "id": profile.id,
-        "username": profile_profile,
-        "posts": paginated_posts,
+        "username": profile.profile,
+        "posts": posts[offset : offset + limit],
         "total_posts": len(posts),
         "limit": limit,
         "offset": offset,
+        "next_cursor": None,
     }
 
 
+@router.get("/posts/{profile_profile}/export.ndjson")
+def export_profile(
+    profile_profile: str,
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    profile = (
+        db.query(InstagramPosts.id)
+        .filter(InstagramPosts.profile == profile_profile)
+        .first()
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    def generate():
+        # 요청 세션은 스트리밍 전에 닫히므로 별도 DB 세션 사용
+        export_db = SessionLocal()
+        try:
+            query = export_db.query(Media).filter(Media.profile == profile_profile)
+            if since:
+                query = query.filter(Media.taken_at >= since)
+            if until:
+                query = query.filter(Media.taken_at < until)
+
+            # keyset 배치로 읽어서 메모리 사용량을 일정하게 유지
+            last = None
+            while True:
+                batch_query = query
+                if last is not None:
+                    batch_query = batch_query.filter(
+                        or_(
+                            Media.taken_at < last.taken_at,
+                            and_(Media.taken_at == last.taken_at, Media.pk < last.pk),
+                        )
+                    )
+                batch = (
+                    batch_query.options(
+                        selectinload(Media.resources), selectinload(Media.assets)
+                    )
+                    .order_by(Media.taken_at.desc(), Media.pk.desc())
+                    .limit(EXPORT_BATCH_SIZE)
+                    .all()
+                )
+                if not batch:
+                    break
+                for media in batch:
+                    yield ndjson_line({"username": profile_profile, **media.to_dict()})
+                last = batch[-1]
+                export_db.expunge_all()
+        finally:
+            export_db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.delete("/posts/{post_id}", response_model=dict)
-async def delete_post(post_id: int, db: Session = Depends(get_db)):
+async def delete_post(post_id: int, db: AsyncSession = Depends(get_async_db)):
     # پیدا کردن پست مورد نظر با id
-    post = db.query(InstagramPosts).filter(InstagramPosts.id == post_id).first()
+    post = await db.get(InstagramPosts, post_id)
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
     # حذف پست
-    db.delete(post)
-    db.commit()
+    media_pks = select(Media.pk).where(Media.profile == post.profile)
+    await db.execute(delete(MediaResource).where(MediaResource.media_pk.in_(media_pks)))
+    # 파일은 다른 media와 공유될 수 있으므로 레코드만 삭제
+    await db.execute(delete(MediaAsset).where(MediaAsset.media_pk.in_(media_pks)))
+    await db.execute(delete(Media).where(Media.profile == post.profile))
+    await db.execute(delete(CrawlCheckpoint).where(CrawlCheckpoint.profile == post.profile))
+    await db.execute(delete(ProfileStats).where(ProfileStats.profile == post.profile))
+    await db.execute(delete(ProfileStatsWeek).where(ProfileStatsWeek.profile == post.profile))
+    await db.delete(post)
+    await db.commit()
 
     return {"detail": "Post deleted successfully"}
 
 
-@router.post("/fetch_posts/")
+@router.post("/fetch_posts/", status_code=202)
 async def get_instagram_data(request: BaseProfile):
     try:
-        # اجرای تابع و بازگرداندن نتیجه در صورت موفقیت
-        print(request.username)
-        await fetch_instagram_data(request.username)
-    
-
-    except ValueError as e:
-        # اگر خطایی از نوع ValueError رخ داد
-        raise HTTPException(status_code=400, detail=f"Error: {str(e)}")
-
-    except Exception as e:
-        # برای هر نوع خطای غیرمنتظره دیگر
-        raise HTTPException(
-            status_code=500, detail=f"An unexpected error occurred: {str(e)}"
+        # 크롤링 작업을 큐에 넣고 바로 job id 반환
+        job = crawl_queue.submit(
+            request.username, request.incremental, download_media=request.download_media
         )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Error: {str(e)}")
+
     return {
-        "status": "success",
+        "status": "queued",
+        "job_id": job.id,
+        "job_url": f"http://127.0.0.1:8000/jobs/{job.id}",
         "url": f"http://127.0.0.1:8000/posts/{request.username}",
     }
+
+
+@router.post("/fetch_posts/batch", status_code=202)
+async def get_instagram_data_batch(request: BatchProfiles):
+    try:
+        # 세션 스케줄러가 계정별 동시성 제한 안에서 작업을 분배
+        batch = crawl_queue.submit_batch(
+            request.usernames,
+            request.incremental,
+            request.priority,
+            download_media=request.download_media,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Error: {str(e)}")
+
+    return {
+        "status": "queued",
+        "batch_id": batch.id,
+        "jobs": len(batch.jobs),
+        "batch_url": f"http://127.0.0.1:8000/jobs/batches/{batch.id}",
+    }
@@ -0,0 +1,89 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from scraper.proxies import mask_proxy_url, proxy_pool
+
+from ..dependencies import get_async_db
+from ..models import InstagramSession, Proxy
+from ..pydantics import ProxyCheckResult, ProxyCreate, ProxyResponse, ProxyUpdate
+
+router = APIRouter()
+
+
+def _proxy_dict(proxy: Proxy, sessions: int = 0):
+    return {
+        "id": proxy.id,
+        "url": mask_proxy_url(proxy.url),
+        "is_active": proxy.is_active,
+        "is_healthy": proxy.is_healthy,
+        "latency_ms": proxy.latency_ms,
+        "failures": proxy.failures or 0,
+        "last_error": proxy.last_error,
+        "last_checked": proxy.last_checked,
+        "sessions": sessions,
+    }
+
+
+@router.get("/proxies/", response_model=List[ProxyResponse])
+async def get_proxies(db: AsyncSession = Depends(get_async_db)):
+    assigned = func.count(InstagramSession.id)
+    rows = await db.execute(
+        select(Proxy, assigned)
+        .outerjoin(InstagramSession, InstagramSession.proxy_id == Proxy.id)
+        .group_by(Proxy.id)
+        .order_by(Proxy.id)
+    )
+    return [_proxy_dict(proxy, sessions) for proxy, sessions in rows]
+
+
+@router.post("/proxies/", response_model=ProxyResponse, status_code=201)
+async def create_proxy(data: ProxyCreate, db: AsyncSession = Depends(get_async_db)):
+    if await db.scalar(select(Proxy.id).where(Proxy.url == data.url)):
+        raise HTTPException(status_code=409, detail="Proxy already exists")
+    proxy = Proxy(url=data.url, is_active=True, is_healthy=True, failures=0)
+    db.add(proxy)
+    await db.commit()
+    return _proxy_dict(proxy)
+
+
+@router.put("/proxies/{proxy_id}", response_model=ProxyResponse)
+async def update_proxy(
+    proxy_id: int, data: ProxyUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    proxy = await db.get(Proxy, proxy_id)
+    if not proxy:
+        raise HTTPException(status_code=404, detail="Proxy not found")
+    if data.is_active is not None:
+        proxy.is_active = data.is_active
+    if data.is_healthy is not None:
+        proxy.is_healthy = data.is_healthy
+        if data.is_healthy:
+            proxy.failures = 0
+    await db.commit()
+    return _proxy_dict(proxy)
+
+
+@router.delete("/proxies/{proxy_id}", response_model=dict)
+async def delete_proxy(proxy_id: int, db: AsyncSession = Depends(get_async_db)):
+    proxy = await db.get(Proxy, proxy_id)
+    if not proxy:
+        raise HTTPException(status_code=404, detail="Proxy not found")
+    # 배정된 세션은 다음 로그인 때 다른 프록시로 재배정
+    await db.execute(
+        InstagramSession.__table__.update()
+        .where(InstagramSession.proxy_id == proxy_id)
+        .values(proxy_id=None)
+    )
+    await db.delete(proxy)
+    await db.commit()
+    return {"detail": "Proxy deleted successfully"}
+
+
+@router.post("/proxies/check", response_model=List[ProxyCheckResult])
+async def check_proxies():
+    """Probe every active proxy now instead of waiting for the next health check"""
+    return await run_in_threadpool(proxy_pool.check_all)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..dependencies import get_async_db
+from ..search import search_media
+
+router = APIRouter()
+
+
+@router.get("/search")
+async def search_captions(
+    q: str = Query(..., min_length=1),
+    profile: Optional[str] = Query(default=None),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    sort: str = Query(default="relevance", pattern="^(relevance|recent)$"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over captions, ranked by relevance or newest first"""
+    rows = await search_media(db, q, profile, since, until, sort, limit + 1, offset)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "query": q,
+        "results": [
+            {"username": media.profile, "score": round(score, 4), **media.to_dict()}
+            for media, score in rows
+        ],
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_more else None,
+    }
@@ -1,15 +1,27 @@
+import logging
+from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from scraper.cache import cache
+from scraper.scheduler import session_scheduler
 from scraper.session import insta_create_session
 
-from ..dependencies import get_db
+from ..config import TEMP_BLOCK_SECONDS
+from ..dependencies import get_async_db, get_db
 from ..models import InstagramSession
-from ..pydantics import InstagramSessionResponse, InstagramSessionUpdate
+from ..pydantics import (
+    InstagramSessionResponse,
+    InstagramSessionUpdate,
+    SessionPoolResponse,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -26,13 +38,12 @@ class LoginRequest(BaseModel):
 
 @router.post("/init-session/")
 def initialize_session(data: LoginRequest, db: Session = Depends(get_db)):
-    print("start initialize_session")
-    print(f"Received login request for username: {data.username}")
+    logger.info(f"Received login request for username: {data.username}")
     
     try:
         return insta_create_session(data, db)
     except Exception as e:
-        print(f"Error details: {str(e)}")
+        logger.error(f"Login failed for {data.username}: {str(e)}")
         raise HTTPException(
             status_code=400,
             detail=f"Login failed: {str(e)}"
@@ -40,30 +51,31 @@ def initialize_session(data: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/sessions/", response_model=List[InstagramSessionResponse])
-def get_sessions(db: Session = Depends(get_db)):
-    sessions = db.query(InstagramSession).all()
+async def get_sessions(db: AsyncSession = Depends(get_async_db)):
+    sessions = (await db.scalars(select(InstagramSession))).all()
     return sessions
 
 
+@router.get("/sessions/pool", response_model=SessionPoolResponse)
+def get_session_pool(db: Session = Depends(get_db)):
+    return {**session_scheduler.stats(db), "cache": cache.stats()}
+
+
 @router.get("/sessions/{session_id}", response_model=InstagramSessionResponse)
-def get_session_detail(session_id: int, db: Session = Depends(get_db)):
-    session = (
-        db.query(InstagramSession).filter(InstagramSession.id == session_id).first()
-    )
+async def get_session_detail(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    session = await db.get(InstagramSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 
 @router.put("/sessions/{session_id}", response_model=InstagramSessionResponse)
-def update_session(
+async def update_session(
     session_id: int,
     session_update: InstagramSessionUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    session = (
-        db.query(InstagramSession).filter(InstagramSession.id == session_id).first()
-    )
+    session = await db.get(InstagramSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -76,26 +88,33 @@ def update_session(
         session.is_challenge = session_update.is_challenge
     if session_update.is_temp_block is not None:
         session.is_temp_block = session_update.is_temp_block
+        if not session_update.is_temp_block:
+            session.temp_block_until = None
+    if session_update.temp_block_until is not None:
+        session.temp_block_until = session_update.temp_block_until
+    elif session.is_temp_block and session.temp_block_until is None:
+        # 만료 시각 없이 막으면 풀에서 영영 빠지므로 기본 쿨다운 적용
+        session.temp_block_until = datetime.now() + timedelta(seconds=TEMP_BLOCK_SECONDS)
     if session_update.number_of_use is not None:
         session.number_of_use = session_update.number_of_use
     if session_update.session_data is not None:
         session.session_data = session_update.session_data
 
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 
 @router.delete("/sessions/{session_id}", response_model=dict)
-def delete_session(session_id: int, db: Session = Depends(get_db)):
+async def delete_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        session = db.query(InstagramSession).filter(InstagramSession.id == session_id).first()
+        session = await db.get(InstagramSession, session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await db.commit()
         return {"detail": "Session deleted successfully"}
     except Exception as e:
-        db.rollback() 
+        await db.rollback() 
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from scraper.stats import rebuild_profile_stats
+
+from ..database import session_scope
+from ..dependencies import get_async_db
+from ..models import ProfileStats, ProfileStatsWeek
+from ..pydantics import BatchStatsRequest, BatchStatsResponse, ProfileStatsResponse
+
+router = APIRouter()
+
+
+async def _recent_weeks(db: AsyncSession, profiles, weeks: int):
+    """The latest `weeks` weekly buckets of each profile, newest first"""
+    if not weeks:
+        return {}
+    position = (
+        func.row_number()
+        .over(partition_by=ProfileStatsWeek.profile, order_by=ProfileStatsWeek.week_start.desc())
+        .label("position")
+    )
+    ranked = (
+        select(ProfileStatsWeek, position)
+        .where(ProfileStatsWeek.profile.in_(profiles))
+        .subquery()
+    )
+    rows = await db.execute(
+        select(ProfileStatsWeek)
+        .join(
+            ranked,
+            (ranked.c.profile == ProfileStatsWeek.profile)
+            & (ranked.c.week_start == ProfileStatsWeek.week_start),
+        )
+        .where(ranked.c.position <= weeks)
+        .order_by(ProfileStatsWeek.profile, ProfileStatsWeek.week_start.desc())
+    )
+    series = defaultdict(list)
+    for (week,) in rows:
+        series[week.profile].append(week.to_dict())
+    return series
+
+
+@router.get("/profiles/{username}/stats", response_model=ProfileStatsResponse)
+async def get_profile_stats(
+    username: str,
+    weeks: int = Query(default=26, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stats = await db.get(ProfileStats, username)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No stats for this profile")
+    series = await _recent_weeks(db, [username], weeks)
+    return {**stats.to_dict(), "weeks": series.get(username, [])}
+
+
+@router.post("/profiles/stats", response_model=BatchStatsResponse)
+async def get_profiles_stats(request: BatchStatsRequest, db: AsyncSession = Depends(get_async_db)):
+    usernames = list(dict.fromkeys(request.usernames))
+    found = {
+        stats.profile: stats
+        for stats in await db.scalars(
+            select(ProfileStats).where(ProfileStats.profile.in_(usernames))
+        )
+    }
+    series = await _recent_weeks(db, list(found), request.weeks)
+    return {
+        "profiles": [
+            {**found[username].to_dict(), "weeks": series.get(username, [])}
+            for username in usernames
+            if username in found
+        ],
+        "missing": [username for username in usernames if username not in found],
+    }
+
+
+@router.post("/profiles/{username}/stats/rebuild", response_model=ProfileStatsResponse)
+async def rebuild_stats(username: str, db: AsyncSession = Depends(get_async_db)):
+    """Recompute a profile's stats from its stored media"""
+
+    def rebuild():
+        with session_scope() as sync_db:
+            rebuild_profile_stats(sync_db, [username])
+
+    await run_in_threadpool(rebuild)
+    return await get_profile_stats(username, weeks=26, db=db)
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from scraper.watches import normalize_hashtag
+
+from ..config import HASHTAG_WATCH_DEFAULT_INTERVAL
+from ..dependencies import get_async_db
+from ..models import HashtagMedia, HashtagWatch, Media
+from ..pagination import decode_cursor, encode_cursor
+from ..pydantics import HashtagWatchCreate, HashtagWatchResponse, HashtagWatchUpdate
+
+router = APIRouter()
+
+
+async def _get_watch(db: AsyncSession, watch_id: int) -> HashtagWatch:
+    watch = await db.get(HashtagWatch, watch_id)
+    if not watch:
+        raise HTTPException(status_code=404, detail="Hashtag watch not found")
+    return watch
+
+
+@router.get("/hashtags/watches", response_model=List[HashtagWatchResponse])
+async def get_watches(db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(HashtagWatch).order_by(HashtagWatch.hashtag))).all()
+
+
+@router.post("/hashtags/watches", response_model=HashtagWatchResponse, status_code=201)
+async def create_watch(request: HashtagWatchCreate, db: AsyncSession = Depends(get_async_db)):
+    hashtag = normalize_hashtag(request.hashtag)
+    if not hashtag:
+        raise HTTPException(status_code=400, detail="Hashtag is empty")
+    if await db.scalar(select(HashtagWatch).where(HashtagWatch.hashtag == hashtag)):
+        raise HTTPException(status_code=409, detail="Hashtag is already watched")
+    watch = HashtagWatch(
+        hashtag=hashtag,
+        interval_seconds=HASHTAG_WATCH_DEFAULT_INTERVAL,
+        min_interval_seconds=request.min_interval_seconds,
+        max_interval_seconds=request.max_interval_seconds,
+        # 등록 직후 다음 tick에서 첫 폴링
+        next_poll_at=datetime.now(),
+    )
+    db.add(watch)
+    await db.commit()
+    await db.refresh(watch)
+    return watch
+
+
+@router.put("/hashtags/watches/{watch_id}", response_model=HashtagWatchResponse)
+async def update_watch(
+    watch_id: int, request: HashtagWatchUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    watch = await _get_watch(db, watch_id)
+    if request.is_active is not None:
+        watch.is_active = request.is_active
+    if request.min_interval_seconds is not None:
+        watch.min_interval_seconds = request.min_interval_seconds
+        watch.interval_seconds = max(watch.interval_seconds, request.min_interval_seconds)
+    if request.max_interval_seconds is not None:
+        watch.max_interval_seconds = request.max_interval_seconds
+        watch.interval_seconds = min(watch.interval_seconds, request.max_interval_seconds)
+    await db.commit()
+    await db.refresh(watch)
+    return watch
+
+
+@router.delete("/hashtags/watches/{watch_id}", response_model=dict)
+async def delete_watch(watch_id: int, db: AsyncSession = Depends(get_async_db)):
+    # 수집된 hashtag_media는 남겨둠
+    watch = await _get_watch(db, watch_id)
+    await db.delete(watch)
+    await db.commit()
+    return {"detail": "Hashtag watch deleted successfully"}
+
+
+@router.post("/hashtags/watches/{watch_id}/poll", response_model=HashtagWatchResponse)
+async def poll_watch_now(watch_id: int, db: AsyncSession = Depends(get_async_db)):
+    watch = await _get_watch(db, watch_id)
+    watch.next_poll_at = datetime.now()
+    await db.commit()
+    await db.refresh(watch)
+    return watch
+
+
+@router.get("/hashtags/{hashtag}/media")
+async def get_hashtag_media(
+    hashtag: str,
+    limit: int = Query(default=20, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    hashtag = normalize_hashtag(hashtag)
+    query = (
+        select(Media)
+        .join(HashtagMedia, HashtagMedia.media_pk == Media.pk)
+        .where(HashtagMedia.hashtag == hashtag)
+    )
+    if cursor:
+        try:
+            taken_at, pk = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            or_(
+                Media.taken_at < taken_at,
+                and_(Media.taken_at == taken_at, Media.pk < pk),
+            )
+        )
+    medias = (
+        await db.scalars(
+            query.options(selectinload(Media.resources), selectinload(Media.assets))
+            .order_by(Media.taken_at.desc(), Media.pk.desc())
+            .limit(limit + 1)
+        )
+    ).all()
+    next_cursor = None
+    if len(medias) > limit:
+        medias = medias[:limit]
+        next_cursor = encode_cursor(medias[-1].taken_at, medias[-1].pk)
+    return {
+        "hashtag": hashtag,
+        "posts": [{"username": media.profile, **media.to_dict()} for media in medias],
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,100 @@
+"""Timing samples, percentiles and regression checks for benchmark scenarios"""
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Result:
+    """Latency samples (seconds) of one measured operation plus its wall time"""
+
+    def __init__(self, name: str, unit: str = "ops"):
+        self.name = name
+        self.unit = unit
+        self.samples = []
+        self.items = 0
+        self.errors = 0
+        self.wall = 0.0
+
+    def add(self, seconds: float, items: int = 1):
+        self.samples.append(seconds)
+        self.items += items
+
+    @contextmanager
+    def measure(self, items: int = 1):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.add(time.perf_counter() - started, items)
+
+    @contextmanager
+    def wall_clock(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wall += time.perf_counter() - started
+
+    def summary(self) -> Dict:
+        wall = self.wall or sum(self.samples)
+        return {
+            "count": len(self.samples),
+            "errors": self.errors,
+            "unit": self.unit,
+            "throughput": round(self.items / wall, 2) if wall else 0.0,
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 2),
+            "p90_ms": round(percentile(self.samples, 90) * 1000, 2),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 2),
+            "max_ms": round(max(self.samples, default=0) * 1000, 2),
+            "wall_s": round(wall, 3),
+        }
+
+
+def report(results: List[Result]) -> Dict[str, Dict]:
+    summaries = {result.name: result.summary() for result in results}
+    header = f"{'scenario':<28}{'count':>8}{'errors':>8}{'throughput':>18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in summaries.items():
+        throughput = f"{s['throughput']} {s['unit']}/s"
+        print(
+            f"{name:<28}{s['count']:>8}{s['errors']:>8}{throughput:>18}"
+            f"{s['p50_ms']:>10}{s['p90_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}"
+        )
+    return summaries
+
+
+def compare(summaries: Dict[str, Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Return regressions against a baseline JSON written by a previous run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, base in baseline.items():
+        current = summaries.get(name)
+        if current is None:
+            continue
+        if base["p90_ms"] and current["p90_ms"] > base["p90_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p90 {current['p90_ms']}ms > baseline {base['p90_ms']}ms")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors > baseline {base.get('errors', 0)}")
+        if base["throughput"] and current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput']} < baseline {base['throughput']}"
+            )
+    return regressions
@@ -0,0 +1,178 @@
+"""Local stand-in for instagrapi.Client used by the benchmarks"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from instagrapi.exceptions import ChallengeRequired, PleaseWaitFewMinutes
+from instagrapi.types import Media, Resource, User, UserShort
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class MockBackend:
+    """Shared fake Instagram: profiles, hashtags, latency and fault injection"""
+
+    def __init__(
+        self,
+        latency_ms: float = 20,
+        jitter_ms: float = 10,
+        rate_limit_rate: float = 0.0,
+        challenge_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_limit_rate = rate_limit_rate
+        self.challenge_rate = challenge_rate
+        self.random = random.Random(seed)
+        self.profiles = {}
+        # username -> 첫 페이지 맨 앞에 오는 고정 게시물 인덱스
+        self.pinned = {}
+        self.calls = 0
+        self.rate_limited = 0
+        self.challenged = 0
+        self.lock = threading.Lock()
+
+    def add_profile(self, username: str, media_count: int):
+        pk = 10_000_000 + len(self.profiles)
+        self.profiles[username] = (pk, media_count)
+        return pk
+
+    def publish(self, username: str, count: int):
+        """Append count newer media to a profile"""
+        pk, media_count = self.profiles[username]
+        self.profiles[username] = (pk, media_count + count)
+
+    def pin(self, username: str, index: int):
+        """Pin an existing media: it moves to the head of the first page, like on Instagram"""
+        self.pinned.setdefault(username, []).append(index)
+
+    def request(self):
+        """Simulate one upstream round trip, possibly failing"""
+        with self.lock:
+            self.calls += 1
+            roll = self.random.random()
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if roll < self.challenge_rate:
+            with self.lock:
+                self.challenged += 1
+            raise ChallengeRequired("challenge_required (injected)")
+        if roll < self.challenge_rate + self.rate_limit_rate:
+            with self.lock:
+                self.rate_limited += 1
+            raise PleaseWaitFewMinutes("Please wait a few minutes (injected)")
+
+
+# 캡션 검색 벤치마크용 단어 (인덱스로 결정되므로 실행마다 같은 캡션)
+CAPTION_WORDS = (
+    "sunset beach coffee travel food city night music friends summer winter "
+    "mountain river street art design fashion fitness yoga running family"
+).split()
+
+
+def caption_for(index: int, tag: str = "") -> str:
+    words = [CAPTION_WORDS[(index * step) % len(CAPTION_WORDS)] for step in (1, 7, 13)]
+    return f"post {index} {' '.join(words)} {tag}".strip()
+
+
+def make_media(user_pk: int, username: str, index: int, tag: str = "") -> Media:
+    pk = user_pk * 100_000 + index
+    carousel = index % 4 == 0
+    return Media(
+        pk=str(pk),
+        id=f"{pk}_{user_pk}",
+        code=f"C{pk}",
+        taken_at=BASE_TIME + timedelta(minutes=index),
+        media_type=8 if carousel else 1,
+        user=UserShort(pk=str(user_pk), username=username, full_name=username.title()),
+        like_count=index % 1000,
+        comment_count=index % 50,
+        caption_text=caption_for(index, tag),
+        thumbnail_url=f"https://cdn.example.com/{pk}.jpg",
+        usertags=[],
+        sponsor_tags=[],
+        resources=[
+            Resource(
+                pk=f"{pk}{position}",
+                media_type=1,
+                thumbnail_url=f"https://cdn.example.com/{pk}_{position}.jpg",
+            )
+            for position in range(3 if carousel else 0)
+        ],
+    )
+
+
+class MockClient:
+    """Implements the subset of instagrapi.Client the crawler uses"""
+
+    def __init__(self, backend: MockBackend):
+        self.backend = backend
+        self.delay_range = None
+        self.settings = {}
+
+    # 세션/로그인 관련
+    def set_settings(self, settings):
+        self.settings = settings or {}
+
+    def get_settings(self):
+        return self.settings
+
+    def set_proxy(self, proxy):
+        return bool(proxy)
+
+    def login(self, username, password):
+        self.backend.request()
+        return True
+
+    def get_timeline_feed(self):
+        self.backend.request()
+        return {}
+
+    # 프로필
+    def user_info_by_username(self, username: str) -> User:
+        self.backend.request()
+        pk, media_count = self.backend.profiles[username]
+        return User(
+            pk=str(pk),
+            username=username,
+            full_name=username.title(),
+            is_private=False,
+            profile_pic_url="https://cdn.example.com/avatar.jpg",
+            is_verified=False,
+            media_count=media_count,
+            follower_count=0,
+            following_count=0,
+            is_business=False,
+        )
+
+    def user_medias_paginated(self, user_id, amount: int = 0, end_cursor: str = ""):
+        """Newest first; the cursor is the index of the next media, like max_id"""
+        self.backend.request()
+        username, media_count = next(
+            (name, count)
+            for name, (pk, count) in self.backend.profiles.items()
+            if str(pk) == str(user_id)
+        )
+        pinned = self.backend.pinned.get(username, [])
+        start = int(end_cursor) if end_cursor else media_count - 1
+        stop = max(-1, start - amount)
+        medias = [
+            make_media(int(user_id), username, index)
+            for index in range(start, stop, -1)
+            if index not in pinned
+        ]
+        if not end_cursor:
+            # 고정 게시물은 날짜와 무관하게 첫 페이지 맨 앞에 옴
+            medias = [make_media(int(user_id), username, index) for index in pinned] + medias
+        return medias, (str(stop) if stop >= 0 else "")
+
+    # 해시태그
+    def hashtag_medias_recent(self, name: str, amount: int = 27):
+        self.backend.request()
+        return [
+            make_media(20_000_000 + index % 50, f"user{index % 50}", index, f"#{name}")
+            for index in range(amount)
+        ]
@@ -0,0 +1,105 @@
+"""Offline benchmarks against a mock Instagram backend
+
+    python -m benchmarks.run --scenarios crawl,incremental,hashtags,pagination,api,search --json results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.25   # CI regression check
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+SCENARIOS = ("crawl", "incremental", "hashtags", "pagination", "api", "search")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of calls raising PleaseWaitFewMinutes")
+    parser.add_argument("--challenge", type=float, default=0.0, help="share of calls raising ChallengeRequired")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--media", type=int, default=10_000, help="media in the crawled profile")
+    parser.add_argument("--hashtags", type=int, default=100)
+    parser.add_argument("--amount-per-tag", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50, help="page size for pagination reads")
+    parser.add_argument("--requests", type=int, default=2000, help="requests in the API load scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--searches", type=int, default=500, help="queries in the search scenario")
+    parser.add_argument("--json", help="write summaries to this file")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir: str):
+    """Point the app at a throwaway database and lift production pacing limits"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("SESSION_REQUESTS_PER_HOUR", "100000000")
+    os.environ.setdefault("SESSION_BURST", "100000")
+    os.environ.setdefault("PACING_MAX_PER_HOUR", "100000000")
+    os.environ.setdefault("BACKOFF_BASE_SECONDS", "0.05")
+    os.environ.setdefault("CACHE_PERSISTENT", "false")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # 요청마다 찍히는 httpx 로그는 결과 표를 가리므로 숨김
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir)
+        from benchmarks import scenarios
+        from benchmarks.harness import compare, report
+
+        ctx = scenarios.Context(args)
+        ctx.setup()
+        results = []
+        if "crawl" in selected:
+            results += scenarios.profile_crawl(ctx)
+        if "incremental" in selected:
+            results += scenarios.incremental_crawl(ctx)
+        if "hashtags" in selected:
+            results += scenarios.hashtag_fanout(ctx)
+        if "pagination" in selected:
+            results += scenarios.deep_pagination(ctx, crawled="crawl" in selected)
+        elif "crawl" not in selected and ("api" in selected or "search" in selected):
+            scenarios._seed_profile(ctx)
+        if "api" in selected:
+            results += scenarios.api_load(ctx)
+        if "search" in selected:
+            results += scenarios.caption_search(ctx)
+
+        print(
+            f"mock upstream: {ctx.backend.calls} calls, "
+            f"{ctx.backend.rate_limited} rate limited, {ctx.backend.challenged} challenged"
+        )
+        summaries = report(results)
+        failures = ctx.failures
+        scenarios.app_shutdown()
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+    if args.baseline:
+        regressions = compare(summaries, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
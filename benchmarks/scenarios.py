@@ -0,0 +1,274 @@
+"""Benchmark scenarios; import only after benchmarks.run has configured the environment"""
+
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+import app.main  # noqa: F401  (scraper 모듈보다 먼저 import 해야 순환 import가 없음)
+from app.database import SessionLocal, async_engine, engine, init_db
+from app.main import app
+from app.models import InstagramSession, Media
+from benchmarks.harness import Result
+from benchmarks.mock_instagram import CAPTION_WORDS, MockBackend, MockClient, make_media
+from scraper.client_pool import client_pool
+from scraper.jobs import CrawlJob
+from scraper.posts import InstagramDataFetcher, get_or_create_insta_post
+from scraper.storage import save_medias
+
+PROFILE = "bench_profile"
+PINNED_PROFILE = "bench_pinned"
+
+
+class Context:
+    def __init__(self, args):
+        self.args = args
+        self.backend = MockBackend(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_limit_rate=args.rate_limit,
+            challenge_rate=args.challenge,
+        )
+        self.session_ids = []
+        # 성능과 무관하게 실행을 실패시키는 정합성 검사 결과
+        self.failures = []
+
+    def setup(self):
+        init_db()
+        db = SessionLocal()
+        try:
+            for index in range(self.args.sessions):
+                session = InstagramSession(
+                    username=f"bench_{index}", password="-", session_data={}
+                )
+                db.add(session)
+                db.commit()
+                self.session_ids.append(session.id)
+                # 로그인 없이 바로 쓰도록 풀에 mock 클라이언트를 등록
+                client_pool.put(session.id, MockClient(self.backend))
+        finally:
+            db.close()
+        self.backend.add_profile(PROFILE, self.args.media)
+
+    def client(self):
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+        )
+
+
+class TimedFetcher(InstagramDataFetcher):
+    """Records upstream fetch and DB save time per page"""
+
+    def __init__(self, fetch: Result, save: Result):
+        self.fetch_result = fetch
+        self.save_result = save
+        super().__init__()
+
+    def _fetch_page(self, user_id, end_cursor, item_per_page=20):
+        with self.fetch_result.measure():
+            return super()._fetch_page(user_id, end_cursor, item_per_page)
+
+    def _save_page(self, profile_username, medias, *args, **kwargs):
+        with self.save_result.measure(items=len(medias)):
+            return super()._save_page(profile_username, medias, *args, **kwargs)
+
+
+def profile_crawl(ctx: Context):
+    """Full crawl of a large profile through InstagramDataFetcher.fetch_posts"""
+    fetch = Result("crawl.fetch_page", "pages")
+    save = Result("crawl.save_page", "media")
+    total = Result("crawl.profile", "media")
+    job = CrawlJob(PROFILE, incremental=False)
+    fetcher = TimedFetcher(fetch, save)
+    try:
+        with total.wall_clock():
+            started = time.perf_counter()
+            fetcher.fetch_posts(PROFILE, progress=job, incremental=False)
+            total.add(time.perf_counter() - started, job.media_count)
+    finally:
+        fetcher.close()
+    if job.errors:
+        total.errors += len(job.errors)
+        print(f"crawl errors: {job.errors[:3]}")
+    return [fetch, save, total]
+
+
+def incremental_crawl(ctx: Context):
+    """Incremental recrawl after new posts and an old pinned post; every new post must be stored"""
+    total = Result("crawl.incremental", "media")
+    ctx.backend.add_profile(PINNED_PROFILE, 100)
+
+    def crawl(incremental):
+        job = CrawlJob(PINNED_PROFILE, incremental=incremental)
+        fetcher = InstagramDataFetcher()
+        try:
+            started = time.perf_counter()
+            fetcher.fetch_posts(PINNED_PROFILE, progress=job, incremental=incremental)
+            total.add(time.perf_counter() - started, job.media_count)
+        finally:
+            fetcher.close()
+        total.errors += len(job.errors)
+        return job
+
+    crawl(False)
+    ctx.backend.publish(PINNED_PROFILE, 60)
+    ctx.backend.pin(PINNED_PROFILE, 5)
+    job = crawl(True)
+    db = SessionLocal()
+    try:
+        stored = db.query(Media).filter(Media.profile == PINNED_PROFILE).count()
+    finally:
+        db.close()
+    if job.new_media != 60 or stored != 160:
+        ctx.failures.append(
+            f"incremental crawl with a pinned post stored {job.new_media}/60 new media "
+            f"({stored}/160 total)"
+        )
+    return [total]
+
+
+def _seed_profile(ctx: Context):
+    """Store the benchmark profile directly when the crawl scenario did not run"""
+    db = SessionLocal()
+    try:
+        get_or_create_insta_post(db, PROFILE, None)
+        pk, media_count = ctx.backend.profiles[PROFILE]
+        for start in range(0, media_count, 500):
+            page = [
+                make_media(pk, PROFILE, index)
+                for index in range(start, min(start + 500, media_count))
+            ]
+            save_medias(db, page, PROFILE)
+    finally:
+        db.close()
+
+
+def hashtag_fanout(ctx: Context):
+    """POST /hashtags/search/stream for many hashtags; latency is time to each result"""
+    arrival = Result("hashtags.result", "tags")
+    tags = [f"bench{int(time.time())}_{index}" for index in range(ctx.args.hashtags)]
+
+    async def run():
+        async with ctx.client() as client:
+            started = time.perf_counter()
+            async with client.stream(
+                "POST",
+                "/hashtags/search/stream",
+                json={"hashtags": tags, "amount_per_tag": ctx.args.amount_per_tag},
+            ) as response:
+                seen = set()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    if item.get("status") == "error":
+                        arrival.errors += 1
+                    # 태그별 첫 줄이 도착한 시점을 해당 태그의 지연으로 기록
+                    tag = item.get("hashtag")
+                    if tag not in seen:
+                        seen.add(tag)
+                        arrival.add(time.perf_counter() - started)
+            arrival.wall = time.perf_counter() - started
+
+    asyncio.run(run())
+    return [arrival]
+
+
+def deep_pagination(ctx: Context, crawled: bool):
+    """Read the whole profile page by page with cursors and with offsets"""
+    if not crawled:
+        _seed_profile(ctx)
+    cursor_reads = Result("pagination.cursor", "pages")
+    offset_reads = Result("pagination.offset", "pages")
+    limit = ctx.args.page_size
+
+    async def run():
+        async with ctx.client() as client:
+            with cursor_reads.wall_clock():
+                cursor = None
+                while True:
+                    params = {"limit": limit}
+                    if cursor:
+                        params["cursor"] = cursor
+                    with cursor_reads.measure():
+                        body = (await client.get(f"/posts/{PROFILE}", params=params)).json()
+                    cursor = body.get("next_cursor")
+                    if not cursor:
+                        break
+
+            # offset 방식은 깊은 페이지일수록 느려지므로 일부 페이지만 샘플링
+            with offset_reads.wall_clock():
+                for offset in range(0, ctx.args.media, limit * 10):
+                    with offset_reads.measure():
+                        await client.get(
+                            f"/posts/{PROFILE}", params={"limit": limit, "offset": offset}
+                        )
+
+    asyncio.run(run())
+    return [cursor_reads, offset_reads]
+
+
+def api_load(ctx: Context):
+    """Concurrent mixed read traffic against the API"""
+    reads = Result("api.requests", "req")
+    rng = random.Random(7)
+    paths = [
+        (f"/posts/{PROFILE}", {"limit": 20}),
+        (f"/posts/{PROFILE}", {"limit": 20, "offset": 1000}),
+        (f"/posts/{PROFILE}", {"limit": 20, "since": "2024-01-02T00:00:00"}),
+        ("/sessions/", {}),
+        ("/sessions/pool", {}),
+    ]
+
+    async def run():
+        queue = asyncio.Queue()
+        for _ in range(ctx.args.requests):
+            queue.put_nowait(rng.choice(paths))
+
+        async def worker(client):
+            while not queue.empty():
+                path, params = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    # 실패한 요청도 회귀 검사에서 보이도록 집계
+                    reads.errors += 1
+                reads.add(time.perf_counter() - started)
+
+        async with ctx.client() as client:
+            with reads.wall_clock():
+                await asyncio.gather(*(worker(client) for _ in range(ctx.args.concurrency)))
+
+    asyncio.run(run())
+    return [reads]
+
+
+def app_shutdown():
+    # 임시 DB 디렉터리를 지우기 전에 커넥션 풀을 정리
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+def caption_search(ctx: Context):
+    """GET /search with one and two word queries over the stored captions"""
+    searches = Result("search.captions", "req")
+    rng = random.Random(11)
+    queries = [rng.choice(CAPTION_WORDS) for _ in range(ctx.args.searches // 2)] + [
+        f"{rng.choice(CAPTION_WORDS)} {rng.choice(CAPTION_WORDS)}"
+        for _ in range(ctx.args.searches - ctx.args.searches // 2)
+    ]
+
+    async def run():
+        async with ctx.client() as client:
+            with searches.wall_clock():
+                for q in queries:
+                    with searches.measure():
+                        response = await client.get("/search", params={"q": q, "limit": 20})
+                        response.raise_for_status()
+
+    asyncio.run(run())
+    return [searches]
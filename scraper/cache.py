@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import CACHE_MAX_ENTRIES, CACHE_PERSISTENT
+from app.database import SessionLocal
+from app.models import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """In-process LRU cache with per-entry TTL, an optional DB tier and single-flight loads"""
+
+    def __init__(self, maxsize: int = CACHE_MAX_ENTRIES, persistent: bool = CACHE_PERSISTENT):
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default=None):
+        value = self._get(key)
+        return default if value is _MISSING else value
+
+    def _get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        if self.persistent:
+            value, ttl = self._load_persistent(key)
+            if value is not _MISSING:
+                self._set_memory(key, value, ttl)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return _MISSING
+
+    def set(self, key: str, value, ttl: float):
+        self._set_memory(key, value, ttl)
+        if self.persistent:
+            self._store_persistent(key, value, ttl)
+
+    def get_or_load(self, key: str, loader, ttl: float, should_cache=None):
+        """Return the cached value or call loader once for all concurrent callers"""
+        value = self._get(key)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if should_cache is None or should_cache(flight.value):
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def purge_expired(self):
+        """Delete expired rows from the DB tier"""
+        if not self.persistent:
+            return 0
+        db = SessionLocal()
+        try:
+            deleted = (
+                db.query(CacheEntry)
+                .filter(CacheEntry.expires_at <= datetime.now())
+                .delete()
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _set_memory(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _load_persistent(self, key: str):
+        db = SessionLocal()
+        try:
+            entry = db.query(CacheEntry).filter(CacheEntry.key == key).first()
+            if entry is None:
+                return _MISSING, 0
+            ttl = (entry.expires_at - datetime.now()).total_seconds()
+            if ttl <= 0:
+                return _MISSING, 0
+            return entry.value, ttl
+        except Exception as e:
+            logger.error(f"Cache read failed for {key}: {e}")
+            return _MISSING, 0
+        finally:
+            db.close()
+
+    def _store_persistent(self, key: str, value, ttl: float):
+        db = SessionLocal()
+        try:
+            db.merge(
+                CacheEntry(
+                    key=key,
+                    value=jsonable_encoder(value),
+                    expires_at=datetime.now() + timedelta(seconds=ttl),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Cache write failed for {key}: {e}")
+        finally:
+            db.close()
+
+
+cache = TTLCache()
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import CrawlCheckpoint
+from scraper.storage import utc_naive
+
+
+def load_checkpoint(db: Session, profile: str) -> Optional[CrawlCheckpoint]:
+    return db.query(CrawlCheckpoint).filter(CrawlCheckpoint.profile == profile).first()
+
+
+def save_checkpoint(
+    db: Session, profile: str, end_cursor: str, session_id: int = None, head=None
+) -> CrawlCheckpoint:
+    """Record one more finished page of a crawl (does not commit)"""
+    checkpoint = load_checkpoint(db, profile)
+    if checkpoint is None:
+        checkpoint = CrawlCheckpoint(profile=profile, pages_done=0)
+        db.add(checkpoint)
+    checkpoint.end_cursor = end_cursor
+    checkpoint.pages_done += 1
+    checkpoint.session_id = session_id
+    if head is not None:
+        checkpoint.head_taken_at, checkpoint.head_pk = utc_naive(head[0]), head[1]
+    return checkpoint
+
+
+def clear_checkpoint(db: Session, profile: str):
+    db.query(CrawlCheckpoint).filter(CrawlCheckpoint.profile == profile).delete()
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+
+from instagrapi import Client
+from instagrapi.exceptions import ChallengeRequired, LoginRequired
+
+from app.config import CLIENT_REVALIDATE_SECONDS
+from app.metrics import LOGIN_SECONDS, observe
+from scraper.proxies import mask_proxy_url
+
+logger = logging.getLogger(__name__)
+
+
+class PooledClient:
+    def __init__(self, client: Client, proxy: str = None):
+        self.client = client
+        self.proxy = proxy
+        self.validated_at = time.monotonic()
+
+
+class InstagramClientPool:
+    """Process-wide pool of logged-in instagrapi clients keyed by InstagramSession.id"""
+
+    def __init__(self, revalidate_after: int = CLIENT_REVALIDATE_SECONDS):
+        self.revalidate_after = revalidate_after
+        self._clients = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _session_lock(self, session_id: int) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    def get(self, session, proxy: str = None) -> Client:
+        """Return a warm client for the session, logging in only when needed"""
+        with self._session_lock(session.id):
+            entry = self._clients.get(session.id)
+            if entry is not None and entry.proxy != proxy:
+                # 프록시가 재배정되면 같은 클라이언트의 연결 경로만 교체
+                logger.info(f"Switching session {session.id} to proxy {mask_proxy_url(proxy)}")
+                entry.client.set_proxy(proxy)
+                entry.proxy = proxy
+            if entry is not None:
+                if time.monotonic() - entry.validated_at < self.revalidate_after:
+                    return entry.client
+                try:
+                    with observe(LOGIN_SECONDS, session=str(session.id), kind="revalidate"):
+                        entry.client.get_timeline_feed()
+                    entry.validated_at = time.monotonic()
+                    return entry.client
+                except (LoginRequired, ChallengeRequired) as e:
+                    logger.info(f"Pooled client for session {session.id} is stale: {e}")
+                    self._clients.pop(session.id, None)
+
+            with observe(LOGIN_SECONDS, session=str(session.id), kind="login"):
+                client = self._login(session, proxy)
+            self._clients[session.id] = PooledClient(client, proxy)
+            return client
+
+    def put(self, session_id: int, client: Client, proxy: str = None):
+        """Seed the pool with a client that has just logged in"""
+        with self._lock:
+            self._clients[session_id] = PooledClient(client, proxy)
+
+    def evict(self, session_id: int):
+        with self._lock:
+            self._clients.pop(session_id, None)
+        logger.info(f"Evicted pooled client for session {session_id}")
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _login(self, session, proxy: str = None) -> Client:
+        logger.info(f"Logging in pooled client for session {session.id}")
+        client = Client()
+        if proxy:
+            client.set_proxy(proxy)
+        client.set_settings(session.session_data or {})
+        client.login(session.username, session.password)
+        try:
+            client.get_timeline_feed()
+        except LoginRequired:
+            # 저장된 세션이 만료된 경우 uuid는 유지하고 새로 로그인
+            logger.info(f"Session {session.id} is invalid, logging in with password")
+            old_session = client.get_settings()
+            client.set_settings({})
+            client.set_uuids(old_session["uuids"])
+            client.login(session.username, session.password)
+        return client
+
+
+client_pool = InstagramClientPool()
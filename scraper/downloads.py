@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_QUEUE_SIZE,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_WORKERS,
+    MEDIA_DIR,
+)
+from app.database import BASE_DIR, UPSERT_INSERTS, session_scope
+from app.metrics import (
+    DOWNLOAD_ASSETS,
+    DOWNLOAD_BYTES,
+    DOWNLOAD_QUEUE_DEPTH,
+    DOWNLOAD_SECONDS,
+    observe,
+)
+from app.models import MediaAsset
+from scraper.storage import media_values, resource_values
+
+logger = logging.getLogger(__name__)
+
+
+def asset_targets(medias) -> List[dict]:
+    """Thumbnail and video URLs of a page of instagrapi medias, one entry per asset"""
+    targets = []
+    for post in medias:
+        values = media_values(post)
+        items = [(-1, values)] + [
+            (resource["position"], resource) for resource in resource_values(post)
+        ]
+        for position, item in items:
+            for kind in ("thumbnail", "video"):
+                url = item[f"{kind}_url"]
+                if url:
+                    targets.append(
+                        {"media_pk": values["pk"], "position": position, "kind": kind, "url": url}
+                    )
+    return targets
+
+
+def _write_chunk(f, hasher, chunk: bytes):
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def _store(tmp_path: str, final_path: str) -> bool:
+    """Move a finished download into place, returning True if the file already existed"""
+    if os.path.exists(final_path):
+        # 재게시된 같은 파일: 기존 파일을 공유
+        os.remove(tmp_path)
+        return True
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return False
+
+
+def _extension(content_type: Optional[str], url: str) -> str:
+    if content_type:
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if extension:
+            return extension
+    return os.path.splitext(urlparse(url).path)[1][:8]
+
+
+class MediaDownloader:
+    """Bounded pool of async workers streaming CDN assets into content-addressed files"""
+
+    def __init__(
+        self,
+        media_dir: str = None,
+        workers: int = DOWNLOAD_WORKERS,
+        queue_size: int = DOWNLOAD_QUEUE_SIZE,
+        timeout: float = DOWNLOAD_TIMEOUT,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ):
+        self.media_dir = media_dir or MEDIA_DIR or os.path.join(BASE_DIR, "media_assets")
+        self.concurrency = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.queue = None
+        self.loop = None
+        self.client = None
+        self.workers = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+
+    async def start(self):
+        if self.workers:
+            return
+        os.makedirs(os.path.join(self.media_dir, "tmp"), exist_ok=True)
+        self.loop = asyncio.get_running_loop()
+        # 큐가 가득 차면 크롤러가 기다리므로 다운로드가 밀려도 메모리가 늘지 않음
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
+        )
+        self.workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} media download workers")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def path_for(self, relative_path: str) -> str:
+        return os.path.join(self.media_dir, relative_path)
+
+    def enqueue(self, db: Session, medias) -> int:
+        """Queue the assets of saved medias, blocking while the queue is full
+
+        Called from crawl worker threads, never from the event loop itself.
+        """
+        if not self.running:
+            return 0
+        targets = asset_targets(medias)
+        if not targets:
+            return 0
+        # 이미 받은 파일은 다시 받지 않음 (CDN URL은 크롤링마다 바뀜)
+        done = set(
+            db.execute(
+                select(MediaAsset.media_pk, MediaAsset.position, MediaAsset.kind)
+                .where(MediaAsset.media_pk.in_({target["media_pk"] for target in targets}))
+                .where(MediaAsset.status == "done")
+            ).all()
+        )
+        queued = 0
+        for target in targets:
+            if (target["media_pk"], target["position"], target["kind"]) in done:
+                continue
+            asyncio.run_coroutine_threadsafe(self.queue.put(target), self.loop).result()
+            queued += 1
+        DOWNLOAD_QUEUE_DEPTH.set(self.queue.qsize())
+        return queued
+
+    async def download(self, url: str):
+        """Stream one URL to disk while hashing it
+
+        Returns (sha256, relative path, size, content type, deduplicated).
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        # 디스크 쓰기와 해싱은 스레드에서: 긴 영상을 받는 동안에도 이벤트 루프(API)를 막지 않음
+        fd, tmp_path = await asyncio.to_thread(
+            tempfile.mkstemp, dir=os.path.join(self.media_dir, "tmp")
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with self.client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("content-type")
+                    # 청크 단위로 쓰므로 긴 영상도 메모리에 통째로 올리지 않음
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+                        size += len(chunk)
+
+            sha256 = hasher.hexdigest()
+            relative_path = os.path.join(
+                sha256[:2], sha256[2:4], sha256 + _extension(content_type, url)
+            )
+            deduplicated = await asyncio.to_thread(
+                _store, tmp_path, self.path_for(relative_path)
+            )
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256, relative_path, size, content_type, deduplicated
+
+    async def _worker(self, index: int):
+        while True:
+            target = await self.queue.get()
+            DOWNLOAD_QUEUE_DEPTH.set(self.queue.qsize())
+            values = {**target, "status": "done", "error": None}
+            try:
+                with observe(DOWNLOAD_SECONDS, kind=target["kind"]):
+                    sha256, path, size, content_type, deduplicated = await self.download(
+                        target["url"]
+                    )
+                values.update(
+                    sha256=sha256,
+                    path=path,
+                    size=size,
+                    content_type=content_type,
+                    downloaded_at=datetime.now(),
+                )
+                DOWNLOAD_BYTES.labels(kind=target["kind"]).inc(size)
+                DOWNLOAD_ASSETS.labels(
+                    result="deduplicated" if deduplicated else "downloaded"
+                ).inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Download of media {target['media_pk']} {target['kind']} failed: {e}"
+                )
+                values.update(status="failed", error=str(e))
+                DOWNLOAD_ASSETS.labels(result="failed").inc()
+            try:
+                await asyncio.to_thread(record_asset, values)
+            except Exception as e:
+                logger.error(f"Could not record asset of media {target['media_pk']}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+def record_asset(values: dict):
+    """Upsert one media_assets row keyed by (media_pk, position, kind)"""
+    with session_scope() as db:
+        upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert is None:
+            asset = db.scalar(
+                select(MediaAsset).where(
+                    MediaAsset.media_pk == values["media_pk"],
+                    MediaAsset.position == values["position"],
+                    MediaAsset.kind == values["kind"],
+                )
+            )
+            if asset is None:
+                asset = MediaAsset()
+                db.add(asset)
+            for key, value in values.items():
+                setattr(asset, key, value)
+            return
+        key_columns = ("media_pk", "position", "kind")
+        stmt = upsert(MediaAsset).values(values)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={key: stmt.excluded[key] for key in values if key not in key_columns},
+            )
+        )
+
+
+media_downloader = MediaDownloader()
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from instagrapi.exceptions import (
+    ChallengeRequired,
+    ClientConnectionError,
+    FeedbackRequired,
+    LoginRequired,
+    PleaseWaitFewMinutes,
+    RateLimitError,
+)
+
+from app.config import HASHTAG_SESSION_CONCURRENCY
+from app.database import SessionLocal
+from app.models import healthy_sessions_query
+from scraper.client_pool import client_pool
+from scraper.proxies import proxy_pool
+
+logger = logging.getLogger(__name__)
+
+# 세션 자체의 문제: 이번 요청에서 세션을 제외하고 태그는 다른 세션에서 재시도
+SESSION_ERROR_TYPES = ("challenge", "login", "feedback", "temp_block")
+# 세션은 계속 쓰지만 태그는 다시 시도할 만한 오류 (프록시 연결 실패)
+RETRY_ERROR_TYPES = SESSION_ERROR_TYPES + ("connection",)
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """error_type of a failed fetch; None for errors that belong to the hashtag itself"""
+    if isinstance(error, ChallengeRequired):
+        return "challenge"
+    if isinstance(error, LoginRequired):
+        return "login"
+    if isinstance(error, FeedbackRequired):
+        return "feedback"
+    if isinstance(error, (PleaseWaitFewMinutes, RateLimitError)):
+        return "temp_block"
+    if isinstance(error, ClientConnectionError):
+        return "connection"
+    return None
+
+
+def load_healthy_sessions():
+    """Load healthy sessions detached from any DB session"""
+    db = SessionLocal()
+    try:
+        sessions = healthy_sessions_query(db).all()
+        db.expunge_all()
+        return sessions
+    finally:
+        db.close()
+
+
+def _pooled_client(session):
+    # 세션에 고정된 프록시로 클라이언트를 가져옴
+    return client_pool.get(session, proxy_pool.proxy_for(session.id))
+
+
+class HashtagFanout:
+    """Spreads hashtag fetches across every healthy session with bounded concurrency"""
+
+    def __init__(self, per_session_concurrency: int = HASHTAG_SESSION_CONCURRENCY):
+        self.per_session_concurrency = max(1, per_session_concurrency)
+
+    async def _clients(self, sessions):
+        clients = []
+        for session in sessions:
+            try:
+                client = await asyncio.to_thread(_pooled_client, session)
+                clients.append((session, client))
+            except Exception as e:
+                logger.error(f"Skipping session {session.id}: {e}")
+                client_pool.evict(session.id)
+        return clients
+
+    async def run(self, hashtags: List[str], fetch: Callable, sessions=None):
+        """Yield fetch(hashtag, client, session) results in completion order
+
+        A session-level failure (see SESSION_ERROR_TYPES) drops the session for this run,
+        and the hashtag is retried on another session, at most once per session.
+        Other errors are returned for their hashtag only.
+        """
+        if sessions is None:
+            sessions = await asyncio.to_thread(load_healthy_sessions)
+        clients = await self._clients(sessions)
+        if not clients:
+            raise ValueError("No available session found")
+
+        pending = asyncio.Queue()
+        for hashtag in hashtags:
+            pending.put_nowait((hashtag, 0))
+        results = asyncio.Queue()
+        broken = set()
+
+        async def worker(session, client):
+            while session.id not in broken:
+                item = await pending.get()
+                try:
+                    if session.id in broken:
+                        # 대기 중에 같은 세션의 다른 작업자가 실패함
+                        pending.put_nowait(item)
+                        return
+                    hashtag, attempts = item
+                    try:
+                        result = await asyncio.to_thread(fetch, hashtag, client, session)
+                    except Exception as e:
+                        result = {"status": "error", "hashtag": hashtag, "error": str(e), "posts": []}
+                        error_type = classify_error(e)
+                        if error_type:
+                            result["error_type"] = error_type
+                    if result.get("status") == "error":
+                        error_type = result.get("error_type")
+                        if error_type in SESSION_ERROR_TYPES:
+                            broken.add(session.id)
+                        if (
+                            error_type in RETRY_ERROR_TYPES
+                            and attempts + 1 < len(clients)
+                            and len(broken) < len(clients)
+                        ):
+                            logger.info(f"Retrying hashtag {hashtag} on another session")
+                            pending.put_nowait((hashtag, attempts + 1))
+                            continue
+                    await results.put(result)
+                finally:
+                    pending.task_done()
+
+        async def supervise():
+            # 모든 태그가 끝나거나 모든 작업자가 (세션 실패로) 멈출 때까지
+            finished = asyncio.ensure_future(pending.join())
+            stopped = asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.wait([finished, stopped], return_when=asyncio.FIRST_COMPLETED)
+            finished.cancel()
+            for task in workers:
+                task.cancel()
+            await results.put(None)
+
+        workers = [
+            asyncio.create_task(worker(session, client))
+            for session, client in clients
+            for _ in range(self.per_session_concurrency)
+        ]
+        supervisor = asyncio.create_task(supervise())
+        try:
+            remaining = len(hashtags)
+            while remaining:
+                result = await results.get()
+                if result is None:
+                    break
+                remaining -= 1
+                yield result
+
+            # 모든 세션이 막혀서 처리하지 못한 해시태그
+            while not pending.empty():
+                hashtag, _ = pending.get_nowait()
+                yield {
+                    "status": "error",
+                    "hashtag": hashtag,
+                    "error": "No available session left",
+                    "posts": [],
+                }
+        finally:
+            supervisor.cancel()
+            for task in workers:
+                task.cancel()
@@ -1,9 +1,12 @@
+import logging
 from typing import List, Optional, Tuple
 from instagrapi.types import Media
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from instagrapi.exceptions import LoginRequired, ClientError, ClientLoginRequired, RateLimitError
 
+logger = logging.getLogger(__name__)
+
 class InstagramHashtagFetcher:
     def __init__(self, client):
         self.client = client
@@ -14,7 +17,7 @@ class InstagramHashtagFetcher:
             medias = self.client.hashtag_medias_recent(name=hashtag, amount=amount)
             return medias
         except LoginRequired:
-            print("Session expired or invalid. Need to login again.")
+            logger.warning("Session expired or invalid. Need to login again.")
             raise HTTPException(
                 status_code=401,
                 detail={
@@ -24,7 +27,7 @@ class InstagramHashtagFetcher:
                 }
             )
         except ClientLoginRequired:
-            print("Client login required")
+            logger.warning("Client login required")
             raise HTTPException(
                 status_code=401,
                 detail={
@@ -34,7 +37,7 @@ class InstagramHashtagFetcher:
                 }
             )
         except RateLimitError:
-            print("Rate limit reached")
+            logger.warning("Rate limit reached")
             raise HTTPException(
                 status_code=429,
                 detail={
@@ -44,7 +47,7 @@ class InstagramHashtagFetcher:
                 }
             )
         except ClientError as e:
-            print(f"Instagram client error: {str(e)}")
+            logger.error(f"Instagram client error: {str(e)}")
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -54,7 +57,7 @@ class InstagramHashtagFetcher:
                 }
             )
         except Exception as e:
-            print(f"Unexpected error fetching hashtag medias: {str(e)}")
+            logger.error(f"Unexpected error fetching hashtag medias: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -70,7 +73,7 @@ class InstagramHashtagFetcher:
         try:
             return self.client.hashtag_info(hashtag)
         except Exception as e:
-            print(f"Error fetching hashtag info: {str(e)}")
+            logger.error(f"Error fetching hashtag info: {str(e)}")
             raise
 
     def get_top_posts(self, hashtag: str, amount: int = 9) -> List[Media]:
@@ -78,5 +81,5 @@ class InstagramHashtagFetcher:
         try:
             return self.client.hashtag_medias_top(name=hashtag, amount=amount)
         except Exception as e:
-            print(f"Error fetching top posts: {str(e)}")
+            logger.error(f"Error fetching top posts: {str(e)}")
             raise 
\ No newline at end of file
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import CRAWL_DISPATCH_WAIT, CRAWL_JOB_RETENTION, CRAWL_WORKERS
+from app.database import session_scope
+from app.metrics import CRAWL_JOBS, CRAWL_QUEUE_DEPTH
+from app.models import healthy_sessions_query
+from scraper.posts import InstagramDataFetcher
+from scraper.scheduler import SessionUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlJob:
+    """A queued profile crawl and its progress"""
+
+    def __init__(
+        self,
+        username: str,
+        incremental: bool = True,
+        priority: int = 0,
+        batch_id: str = None,
+        download_media: bool = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.incremental = incremental
+        # None이면 DOWNLOAD_MEDIA 설정을 따름
+        self.download_media = download_media
+        self.priority = priority
+        self.batch_id = batch_id
+        self.status = "queued"
+        self.pages_fetched = 0
+        self.media_count = 0
+        self.new_media = 0
+        self.errors = []
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    def add_error(self, error):
+        self.errors.append(str(error))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "username": self.username,
+            "incremental": self.incremental,
+            "download_media": self.download_media,
+            "priority": self.priority,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "pages_fetched": self.pages_fetched,
+            "media_count": self.media_count,
+            "new_media": self.new_media,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class CrawlBatch:
+    """A group of crawl jobs submitted together, with aggregate progress"""
+
+    def __init__(self, priority: int = 0):
+        self.id = uuid.uuid4().hex
+        self.priority = priority
+        self.jobs = []
+        self.created_at = datetime.now()
+
+    def to_dict(self):
+        statuses = {"queued": 0, "running": 0, "success": 0, "failed": 0}
+        for job in self.jobs:
+            statuses[job.status] += 1
+        finished = [job.finished_at for job in self.jobs if job.finished_at]
+        done = statuses["success"] + statuses["failed"]
+        return {
+            "id": self.id,
+            "priority": self.priority,
+            "total": len(self.jobs),
+            **statuses,
+            "progress": round(done / len(self.jobs), 3) if self.jobs else 1.0,
+            "pages_fetched": sum(job.pages_fetched for job in self.jobs),
+            "media_count": sum(job.media_count for job in self.jobs),
+            "new_media": sum(job.new_media for job in self.jobs),
+            "failures": [
+                {"job_id": job.id, "username": job.username, "errors": job.errors}
+                for job in self.jobs
+                if job.status == "failed"
+            ],
+            "created_at": self.created_at,
+            "finished_at": max(finished) if self.jobs and done == len(self.jobs) else None,
+        }
+
+
+def run_crawl_job(job: CrawlJob, fetcher: InstagramDataFetcher = None):
+    """Run one crawl job (blocking, called from the worker threadpool)"""
+    fetcher = fetcher or InstagramDataFetcher()
+    try:
+        return fetcher.fetch_posts(
+            job.username,
+            progress=job,
+            incremental=job.incremental,
+            download_media=job.download_media,
+        )
+    finally:
+        fetcher.close()
+
+
+def lease_fetcher(timeout: float = CRAWL_DISPATCH_WAIT) -> Optional[InstagramDataFetcher]:
+    """A fetcher on a leased session, or None if every healthy session is busy
+
+    Raises SessionUnavailable when there is no healthy session at all.
+    """
+    try:
+        return InstagramDataFetcher(acquire_timeout=timeout)
+    except SessionUnavailable:
+        with session_scope() as db:
+            if healthy_sessions_query(db).first() is None:
+                raise
+        return None
+
+
+class CrawlJobQueue:
+    """In-process job queue drained by a bounded pool of asyncio workers"""
+
+    def __init__(self, concurrency: int = CRAWL_WORKERS, retention: int = CRAWL_JOB_RETENTION):
+        self.concurrency = concurrency
+        self.retention = retention
+        self.jobs = OrderedDict()
+        self.batches = OrderedDict()
+        self.queue = None
+        self.workers = []
+        self._sequence = 0
+        self._dispatch = None
+
+    async def start(self):
+        if self.workers:
+            return
+        # 우선순위가 높은 작업부터, 같은 우선순위는 제출 순서대로
+        self.queue = asyncio.PriorityQueue()
+        self._dispatch = asyncio.Lock()
+        self.workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} crawl workers")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(
+        self,
+        username: str,
+        incremental: bool = True,
+        priority: int = 0,
+        batch_id: str = None,
+        download_media: bool = None,
+    ) -> CrawlJob:
+        if self.queue is None:
+            raise RuntimeError("Crawl job queue is not running")
+        job = CrawlJob(username, incremental, priority, batch_id, download_media)
+        self.jobs[job.id] = job
+        self._prune()
+        self._sequence += 1
+        self.queue.put_nowait((-priority, self._sequence, job))
+        CRAWL_QUEUE_DEPTH.set(self.queue.qsize())
+        return job
+
+    def submit_batch(
+        self,
+        usernames: List[str],
+        incremental: bool = True,
+        priority: int = 0,
+        download_media: bool = None,
+    ) -> CrawlBatch:
+        batch = CrawlBatch(priority)
+        # 중복 username은 한 번만 크롤링
+        for username in dict.fromkeys(usernames):
+            batch.jobs.append(
+                self.submit(username, incremental, priority, batch.id, download_media)
+            )
+        self.batches[batch.id] = batch
+        while len(self.batches) > self.retention:
+            self.batches.popitem(last=False)
+        return batch
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self.jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Optional[CrawlBatch]:
+        return self.batches.get(batch_id)
+
+    def _prune(self):
+        # 오래된 완료 작업부터 정리
+        if len(self.jobs) <= self.retention:
+            return
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.retention:
+                break
+            if self.jobs[job_id].status in ("success", "failed"):
+                del self.jobs[job_id]
+
+    async def _next(self):
+        """Wait for a free session, then hand it the highest-priority queued job
+
+        Returns (job, fetcher); fetcher is an exception if no session can ever be leased.
+        """
+        # 한 작업자만 세션을 기다리므로 세션이 비면 그 시점의 최우선 작업이 실행됨
+        async with self._dispatch:
+            while True:
+                item = await self.queue.get()
+                try:
+                    fetcher = await run_in_threadpool(lease_fetcher)
+                except Exception as e:
+                    fetcher = e
+                if fetcher is not None:
+                    return item[-1], fetcher
+                # 모든 세션이 사용 중: 실패시키지 않고 같은 순서 키로 되돌린 뒤 다시 확인
+                self.queue.put_nowait(item)
+                self.queue.task_done()
+
+    async def _worker(self, index: int):
+        while True:
+            job, fetcher = await self._next()
+            CRAWL_QUEUE_DEPTH.set(self.queue.qsize())
+            job.status = "running"
+            job.started_at = datetime.now()
+            try:
+                if isinstance(fetcher, Exception):
+                    raise fetcher
+                ok = await run_in_threadpool(run_crawl_job, job, fetcher)
+                job.status = "success" if ok else "failed"
+            except Exception as e:
+                logger.error(f"Crawl job {job.id} for {job.username} failed: {e}")
+                job.add_error(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = datetime.now()
+                CRAWL_JOBS.labels(status=job.status).inc()
+                self.queue.task_done()
+
+
+crawl_queue = CrawlJobQueue()
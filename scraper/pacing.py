@@ -0,0 +1,255 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from instagrapi.exceptions import (
+    ClientThrottledError,
+    FeedbackRequired,
+    PleaseWaitFewMinutes,
+    RateLimitError,
+)
+
+from app.config import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    PACING_DECREASE_FACTOR,
+    PACING_INCREASE_PER_HOUR,
+    PACING_MAX_PER_HOUR,
+    PACING_MIN_PER_HOUR,
+    PACING_WINDOW_SECONDS,
+    RETRY_BUDGET_MAX,
+    RETRY_BUDGET_RATIO,
+    RETRY_MAX_ATTEMPTS,
+    SESSION_BURST,
+    SESSION_REQUESTS_PER_HOUR,
+)
+from app.metrics import PACING_RATE, UPSTREAM_SECONDS, observe, session_event
+
+logger = logging.getLogger(__name__)
+
+# 요청 속도를 낮춰야 한다는 업스트림 신호
+THROTTLE_ERRORS = (ClientThrottledError, FeedbackRequired, PleaseWaitFewMinutes, RateLimitError)
+# 그 중 잠시 후 다시 시도할 수 있는 것 (FeedbackRequired는 계정 차단이라 재시도하지 않음)
+RETRYABLE_ERRORS = (ClientThrottledError, PleaseWaitFewMinutes, RateLimitError)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Request budget that refills at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+    def take(self, cost: float = 1) -> float:
+        """Take tokens if possible; return 0 on success or the seconds to wait"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0
+            return (cost - self.tokens) / self.rate
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate follows AIMD: additive increase, multiplicative decrease"""
+
+    def __init__(self, rate, capacity, min_rate, max_rate, increase, decrease_factor, window):
+        super().__init__(rate, capacity)
+        self.min_rate = min(min_rate, rate)
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.window = window
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self._recent = deque()
+
+    def take(self, cost: float = 1) -> float:
+        wait = super().take(cost)
+        if not wait:
+            with self.lock:
+                self.requests += 1
+                self._recent.append(time.monotonic())
+        return wait
+
+    def on_success(self):
+        with self.lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self.lock:
+            self._refill()
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # 남은 버스트도 버려서 바로 다시 몰아치지 않도록
+            self.tokens = 0
+
+    def effective_rate(self) -> float:
+        """Requests actually sent per second over the sliding window"""
+        with self.lock:
+            cutoff = time.monotonic() - self.window
+            while self._recent and self._recent[0] < cutoff:
+                self._recent.popleft()
+            return len(self._recent) / self.window
+
+
+class RetryBudget:
+    """Allows retries only up to a fraction of recent requests"""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, maximum: float = RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = maximum
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Pacer:
+    """Adaptive per-account, per-endpoint pacing with jittered backoff and retry budgets"""
+
+    def __init__(
+        self,
+        requests_per_hour: float = SESSION_REQUESTS_PER_HOUR,
+        burst: int = SESSION_BURST,
+        min_per_hour: float = PACING_MIN_PER_HOUR,
+        max_per_hour: float = PACING_MAX_PER_HOUR,
+        increase_per_hour: float = PACING_INCREASE_PER_HOUR,
+        decrease_factor: float = PACING_DECREASE_FACTOR,
+        window: int = PACING_WINDOW_SECONDS,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+    ):
+        self.rate = requests_per_hour / 3600.0
+        self.burst = burst
+        self.min_rate = min_per_hour / 3600.0
+        self.max_rate = max_per_hour / 3600.0
+        self.increase = increase_per_hour / 3600.0
+        self.decrease_factor = decrease_factor
+        self.window = window
+        self.max_attempts = max_attempts
+        self._buckets = {}
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, session_id: int, endpoint: str = "default") -> AdaptiveTokenBucket:
+        with self._lock:
+            bucket = self._buckets.get((session_id, endpoint))
+            if bucket is None:
+                bucket = self._buckets[(session_id, endpoint)] = AdaptiveTokenBucket(
+                    self.rate,
+                    self.burst,
+                    self.min_rate,
+                    self.max_rate,
+                    self.increase,
+                    self.decrease_factor,
+                    self.window,
+                )
+            return bucket
+
+    def budget(self, session_id: int) -> RetryBudget:
+        with self._lock:
+            return self._budgets.setdefault(session_id, RetryBudget())
+
+    def available(self, session_id: int) -> float:
+        """Tokens left on the session's most constrained endpoint"""
+        with self._lock:
+            buckets = [b for (sid, _), b in self._buckets.items() if sid == session_id]
+        if not buckets:
+            return float(self.burst)
+        return min(bucket.available() for bucket in buckets)
+
+    def wait(self, session_id: int, endpoint: str = "default", cost: float = 1):
+        """Block until the endpoint's budget allows another upstream request"""
+        bucket = self.bucket(session_id, endpoint)
+        while True:
+            wait = bucket.take(cost)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def call(self, session_id: int, endpoint: str, fn, *args, **kwargs):
+        """Pace, run and (on throttling) retry an upstream call for a session"""
+        bucket = self.bucket(session_id, endpoint)
+        budget = self.budget(session_id)
+        budget.deposit()
+        attempt = 0
+        while True:
+            self.wait(session_id, endpoint)
+            try:
+                with observe(UPSTREAM_SECONDS, endpoint=endpoint, session=str(session_id)):
+                    result = fn(*args, **kwargs)
+            except THROTTLE_ERRORS as e:
+                bucket.on_throttle()
+                self._report_rate(session_id, endpoint, bucket)
+                session_event(
+                    session_id, "feedback" if isinstance(e, FeedbackRequired) else "rate_limited"
+                )
+                if (
+                    not isinstance(e, RETRYABLE_ERRORS)
+                    or attempt + 1 >= self.max_attempts
+                    or not budget.withdraw()
+                ):
+                    raise
+                delay = backoff_delay(attempt)
+                bucket.retries += 1
+                logger.info(
+                    f"Session {session_id} throttled on {endpoint} ({type(e).__name__}), "
+                    f"retrying in {delay:.1f}s at {bucket.rate * 3600:.0f} req/h"
+                )
+                time.sleep(delay)
+                attempt += 1
+                continue
+            bucket.on_success()
+            self._report_rate(session_id, endpoint, bucket)
+            return result
+
+    def _report_rate(self, session_id: int, endpoint: str, bucket: AdaptiveTokenBucket):
+        PACING_RATE.labels(session=str(session_id), endpoint=endpoint).set(bucket.rate * 3600)
+
+    def stats(self):
+        with self._lock:
+            items = sorted(self._buckets.items())
+        return [
+            {
+                "session_id": session_id,
+                "endpoint": endpoint,
+                "rate_per_hour": round(bucket.rate * 3600, 1),
+                "effective_per_hour": round(bucket.effective_rate() * 3600, 1),
+                "tokens": round(bucket.available(), 2),
+                "requests": bucket.requests,
+                "throttled": bucket.throttled,
+                "retries": bucket.retries,
+            }
+            for (session_id, endpoint), bucket in items
+        ]
@@ -1,28 +1,42 @@
+import logging
 from datetime import datetime
 
-from instagrapi import Client
 from instagrapi.exceptions import (
     ChallengeRequired,
+    ClientConnectionError,
     FeedbackRequired,
     LoginRequired,
     PleaseWaitFewMinutes,
-    RecaptchaChallengeForm,
-    SelectContactPointRecoveryForm,
+    RateLimitError,
 )
 from sqlalchemy.orm import Session
-from starlette.concurrency import run_in_threadpool
 
-from app.database import SessionLocal
-from app.models import InstagramPosts, get_best_session
+from app.config import (
+    CACHE_TTL_USER_ID,
+    DOWNLOAD_MEDIA,
+    FEEDBACK_BLOCK_SECONDS,
+    SESSION_ACQUIRE_TIMEOUT,
+)
+from app.database import SessionLocal, session_scope
+from app.metrics import CRAWL_MEDIA, CRAWL_PAGE_SECONDS, timed
+from app.models import InstagramPosts
+from scraper.cache import cache
+from scraper.checkpoints import clear_checkpoint, load_checkpoint, save_checkpoint
+from scraper.client_pool import client_pool
+from scraper.downloads import media_downloader
+from scraper.profiles import lookup_user_id, remember_users
+from scraper.proxies import proxy_pool
+from scraper.scheduler import SessionUnavailable, session_scheduler
+from scraper.storage import save_medias, utc_naive
 
-db = SessionLocal()
+logger = logging.getLogger(__name__)
 
 
 def get_or_create_insta_post(db: Session, profile_username: str, session_obj):
     # تلاش برای یافتن رکورد
     insta_post = (
         db.query(InstagramPosts)
-        .filter_by(profile=profile_username, session=session_obj)
+        .filter_by(profile=profile_username)
         .first()
     )
 
@@ -44,206 +58,274 @@ def get_or_create_insta_post(db: Session, profile_username: str, session_obj):
     return insta_post, created
 
 
-class InstagramDataFetcher:
-    print("start fetch_instagram_data")
+def _newer(a, b):
+    """Return the newer of two (taken_at, pk) pairs, either of which may be None"""
+    if a is None or (b is not None and b[0] > a[0]):
+        return b
+    return a
+
 
-    def __init__(self, db=db, proxy_ip="http://170.64.207.199", proxy_port="3128"):
-        self.db = db
-        self.session = self.session = get_best_session(self.db)
-        if not self.session:
-            raise ValueError("No available session found")
+def _newest(newest, medias):
+    """Track the newest (taken_at, pk) seen so far"""
+    for post in medias:
+        newest = _newer(newest, (utc_naive(post.taken_at), str(post.pk)))
+    return newest
+
+
+def _reached(medias, taken_at):
+    # 페이지 전체가 기준 시각 이전일 때만 이미 저장된 구간으로 판단
+    # (고정 게시물은 오래됐어도 첫 페이지 맨 앞에 오므로 가장 오래된 항목으로 판단하면 안 됨)
+    return bool(
+        taken_at and medias and max(utc_naive(post.taken_at) for post in medias) <= taken_at
+    )
 
-        self.set_proxy = f"{proxy_ip}:{proxy_port}"
 
-        self.client = Client()
-        self.client.set_proxy(self.set_proxy)
-        self.client.set_settings(self.session.session_data)
-        self.client.delay_range = [1, 50]
+class InstagramDataFetcher:
+    def __init__(self, db: Session = None, acquire_timeout: float = SESSION_ACQUIRE_TIMEOUT):
+        # DB 세션은 스레드 간에 공유하지 않음: 넘겨받지 않으면 fetcher 전용 세션 생성
+        self._owns_db = db is None
+        self.db = db if db is not None else SessionLocal()
+        self.session = None
+
+        self.proxy = None
+        # 저장한 media의 썸네일/영상을 다운로드 큐에 넣을지
+        self.download_media = DOWNLOAD_MEDIA
+
+        self.client = None
         self.logged_in = False
-        self.login()
+        try:
+            # 스케줄러가 다른 작업자와 겹치지 않는 세션을 할당
+            self.session = session_scheduler.acquire(self.db, timeout=acquire_timeout)
+            if not self.session:
+                raise SessionUnavailable("No available session found")
+            self.login()
+        except Exception:
+            self.close()
+            raise
 
     def login(self):
-        print("-------------------login")
-        USERNAME = self.session.username
-        PASSWORD = self.session.password
         try:
-            self.client.login(USERNAME, PASSWORD)
+            # 세션별로 로그인된 클라이언트를 풀에서 재사용
+            # 세션에 고정된 프록시 사용, 요청 간격은 스케줄러의 적응형 pacing이 담당
+            self.proxy = proxy_pool.assign(self.db, self.session)
+            self.client = client_pool.get(self.session, proxy=self.proxy)
             self.logged_in = True
-            try:
-                self.client.get_timeline_feed()
-            except LoginRequired:
-                print("Session is invalid, need to login via username and password")
-                old_session = self.client.get_settings()
+        except Exception as e:
+            client_pool.evict(self.session.id)
 
-                self.client.set_settings({})
-                self.client.set_uuids(old_session["uuids"])
+            # 프록시 연결 실패: 계정 문제가 아니므로 프록시만 제외하고 다시 로그인
+            if isinstance(e, ClientConnectionError) and self.proxy:
+                logger.warning(f"Proxy connection failed for session {self.session.id}: {e}")
+                proxy_pool.report_failure(self.session.proxy_id, e, disable=True)
+                self.db.expire_all()
+                return self.login()
 
-                self.client.login(USERNAME, PASSWORD)
-            # login_via_session = True
-        except Exception as e:
+            # 직접 연결 실패(네트워크 장애): 계정 문제가 아니므로 세션을 막지 않고 그대로 실패
+            if isinstance(e, ClientConnectionError):
+                logger.warning(f"Connection failed for session {self.session.id}: {e}")
+                raise
 
             # If Login Required
             if isinstance(e, LoginRequired):
-                print("LoginRequired")
-                self.client.logger.exception(e)
-                self.client.relogin()
+                logger.warning(f"LoginRequired for session {self.session.id}")
                 self.session.hit_challenge()
-                self.session = get_best_session(self.db)
-                self.client.set_settings(self.session.session_data)
-                self.login()
 
             # If We Hit The Challenge
             elif isinstance(e, ChallengeRequired):
-                print("ChallengeRequired-----isinstance")
-                try:
-                    self.client.challenge_resolve(self.client.last_json)
-                except ChallengeRequired as e:
-                    content = f"Challenge Required: {e}"
-                except (
-                    ChallengeRequired,
-                    SelectContactPointRecoveryForm,
-                    RecaptchaChallengeForm,
-                ) as e:
-                    content = f"Challenge, Recaptcha Required: {e}"
-
+                logger.warning(f"ChallengeRequired for session {self.session.id}: {e}")
                 self.session.hit_challenge()
-                self.session = get_best_session(self.db)
-                self.client.set_settings(self.session.session_data)
-                self.login()
 
             # If We Need To Send Feed Back
             elif isinstance(e, FeedbackRequired):
-                print("FeedbackRequired----isinstance")
-
-                message = self.client.last_json["feedback_message"]
-                if "This action was blocked. Please try again later" in message:
-                    content = f"Action Blocked, Freeze For 12 Hour: {e}"
-
-                elif "We restrict certain activity to protect our community" in message:
-                    # 6 hours is not enough
-                    content = f"Action Blocked 2, Freeze For 12 Hour: {e}"
-
-                elif "Your account has been temporarily blocked" in message:
-                    """
-                    Based on previous use of this feature, your account has been temporarily
-                    blocked from taking this action.
-                    This block will expire on 2020-03-27.
-                    """
-                    content = f"Action Blocked: {e}"
-                self.session.temp_block()
-                self.session = get_best_session(self.db)
-                self.client.set_settings(self.session.session_data)
-                self.login()
+                """
+                e.g. "This action was blocked. Please try again later",
+                "We restrict certain activity to protect our community",
+                "Your account has been temporarily blocked"
+                """
+                logger.warning(f"FeedbackRequired for session {self.session.id}: {e}")
+                self.session.temp_block(FEEDBACK_BLOCK_SECONDS)
 
             # If Need To Wait Few Minutes
             elif isinstance(e, PleaseWaitFewMinutes):
-                print("PleaseWaitFewMinutes")
+                logger.warning(f"PleaseWaitFewMinutes for session {self.session.id}")
                 self.session.temp_block()
-                self.session = get_best_session(self.db)
-                self.client.set_settings(self.session.session_data)
-                self.login()
 
             # We Blocked
             else:
-                print("We Blocked")
+                logger.warning(f"Session {self.session.id} blocked: {e}")
                 self.session.block()
-                self.session = get_best_session(self.db)
-                self.client.set_settings(self.session.session_data)
-                self.login()
 
-    def fetch_posts(self, profile_username):
+            session_scheduler.release(self.session.id)
+            self.session = session_scheduler.acquire(self.db)
+            if not self.session:
+                raise SessionUnavailable("No available session found")
+            self.login()
+
+    def close(self):
+        """Return the leased session to the scheduler and close an owned DB session"""
+        if self.session is not None:
+            session_scheduler.release(self.session.id)
+            self.session = None
+        if self._owns_db:
+            self.db.close()
+
+    def resolve_user_id(self, profile_username):
+        """Resolve a username to its user id: TTL cache, then profile index, then Instagram"""
+        def load():
+            # 프로필 인덱스에 있으면 업스트림 호출 없이 사용
+            user_id = lookup_user_id(self.db, profile_username)
+            if user_id is not None:
+                return user_id
+
+            user = session_scheduler.call(
+                self.session.id,
+                "user_info",
+                self.client.user_info_by_username,
+                profile_username,
+            )
+            remember_users(self.db, [user])
+            return str(user.pk)
+
+        return cache.get_or_load(
+            f"user_id:{profile_username.lower()}", load, CACHE_TTL_USER_ID
+        )
 
-        print(f"--------------------------starting fetch_posts: {profile_username}")
+    def _fetch_page(self, user_id, end_cursor, item_per_page=20):
+        with timed(CRAWL_PAGE_SECONDS, stage="fetch"):
+            return session_scheduler.call(
+                self.session.id,
+                "user_medias",
+                self.client.user_medias_paginated,
+                user_id,
+                item_per_page,
+                end_cursor=end_cursor,
+            )
+
+    def _save_page(
+        self, profile_username, medias, progress=None, checkpoint=None, finished=False
+    ):
+        """Upsert one page and advance (or clear) the crawl checkpoint in one transaction"""
+        with timed(CRAWL_PAGE_SECONDS, stage="save"), session_scope() as page_db:
+            new_count = save_medias(page_db, medias, profile_username, commit=False)
+            if finished:
+                clear_checkpoint(page_db, profile_username)
+            elif checkpoint is not None:
+                end_cursor, head = checkpoint
+                save_checkpoint(
+                    page_db, profile_username, end_cursor, self.session.id, head
+                )
+        logger.debug(f"{profile_username}: {len(medias)} medias, {new_count} new")
+        if self.download_media:
+            # 페이지가 커밋된 뒤에 넣어야 media_assets의 외래키가 유효함
+            media_downloader.enqueue(self.db, medias)
+        CRAWL_MEDIA.labels(kind="fetched").inc(len(medias))
+        CRAWL_MEDIA.labels(kind="new").inc(new_count)
+
+        if progress is not None:
+            progress.pages_fetched += 1
+            progress.media_count += len(medias)
+            progress.new_media += new_count
+
+    def fetch_posts(
+        self, profile_username, progress=None, incremental=True, download_media=None
+    ):
+
+        logger.info(f"Starting fetch_posts for {profile_username} on session {self.session.id}")
+        if download_media is not None:
+            self.download_media = download_media
         try:
             if self.logged_in:
-                profile_info = self.client.user_info_by_username(profile_username)
-                user_id = self.client.user_id_from_username(profile_username)
-                medias_count = profile_info.media_count
-                print(f"medias_count:{medias_count}")
+                user_id = self.resolve_user_id(profile_username)
 
                 # notify the session used once again
-                self.session.increment_use(db)
-
+                self.session.increment_use(self.db)
+
+                insta_post, created = get_or_create_insta_post(
+                    self.db, profile_username, self.session
+                )
+                if created:
+                    logger.info(f"New post created for profile: {profile_username}")
+
+                # 증분 모드: 마지막으로 저장된 media까지만 페이지를 가져옴
+                stored_taken_at = utc_naive(insta_post.last_taken_at)
+                last_taken_at = stored_taken_at if incremental else None
+                newest = None
                 end_cursor = None
-                all_posts = []
-                item_per_page = 20
-                while medias_count > 0:
-                    medias, end_cursor = self.client.user_medias_paginated(
-                        user_id, item_per_page, end_cursor=end_cursor
+
+                with session_scope() as checkpoint_db:
+                    checkpoint = load_checkpoint(checkpoint_db, profile_username)
+                    if checkpoint is not None:
+                        resume_cursor = checkpoint.end_cursor
+                        # 체크포인트 시각도 media 시각과 같은 naive UTC로 비교
+                        head = checkpoint.head_taken_at and (
+                            utc_naive(checkpoint.head_taken_at),
+                            checkpoint.head_pk,
+                        )
+                        logger.info(
+                            f"{profile_username}: resuming after {checkpoint.pages_done} "
+                            f"pages (session {checkpoint.session_id})"
+                        )
+
+                exhausted = False
+                if checkpoint is not None:
+                    # 중단 이후 새로 올라온 게시물만 먼저 수집하고 저장된 커서로 이동
+                    stop_at = max(
+                        (t for t in (head and head[0], last_taken_at) if t), default=None
                     )
-                    counter = 1
-                    for post in medias:
-                        print(f"{counter}_______{post.caption_text[:10]}")
-                        current_post = {
-                            "caption": post.caption_text,
-                            "likes": post.like_count,
-                            "comments": post.comment_count,
-                            "reels": str(post.video_url),
-                            "type": post.media_type,
-                            "imgs": [
-                                {
-                                    "thumbnail_url": str(
-                                        resource.thumbnail_url
-                                        if resource.media_type == 1
-                                        else resource.video_url
-                                    ),
-                                    "video_url": str(resource.video_url),
-                                }
-                                for resource in post.resources
-                            ],
-                        }
-                        all_posts.append(current_post)
-                    medias_count -= item_per_page
-
-                    insta_post, created = get_or_create_insta_post(
-                        self.db, profile_username, self.session
+                    while True:
+                        medias, end_cursor = self._fetch_page(user_id, end_cursor)
+                        newest = _newest(newest, medias)
+                        exhausted = not end_cursor
+                        self._save_page(
+                            profile_username, medias, progress, finished=exhausted
+                        )
+                        if exhausted or _reached(medias, stop_at):
+                            break
+                    newest = _newer(newest, head)
+                    end_cursor = resume_cursor
+
+                while not exhausted:
+                    medias, end_cursor = self._fetch_page(user_id, end_cursor)
+                    newest = _newest(newest, medias)
+                    finished = not end_cursor or _reached(medias, last_taken_at)
+                    self._save_page(
+                        profile_username,
+                        medias,
+                        progress,
+                        checkpoint=None if finished else (end_cursor, newest),
+                        finished=finished,
                     )
-                    if created:
-                        print(f"New post created for profile: {profile_username}")
-                    else:
-                        print(f"Post already exists for profile: {profile_username}")
-
-                        if created:
-                            # اگر پست جدید ایجاد شد
-                            insta_post.fill_object(
-                                session=self.session, json_posts=all_posts
-                            )
-                            print(f"New post created for profile: {profile_username}")
-                        else:
-                            print("else")
-                            # دریافت json قدیمی
-                            print(type(insta_post.json_posts))
-                            existing_json_data = insta_post.json_posts or []
-
-                            print(f"step 1 {existing_json_data}")
-                            # اضافه کردن json جدید به داده‌های قبلی
-                            existing_json_data.append(all_posts)
-
-                            # به‌روزرسانی json پست
-                            insta_post.json_posts = existing_json_data[-1]  # آخرین json
-                            print(
-                                "/////////////////////////",
-                                insta_post,
-                                "/////////////////////////",
-                            )
-                            self.db.add(insta_post)
-                            self.db.commit()
-                            self.db.refresh(insta_post)  # به‌روزرسانی شیء پس از commit
-
-                            print(f"Post updated for profile: {profile_username}")
+                    if finished:
+                        if end_cursor:
+                            logger.info(f"{profile_username}: reached already stored media")
+                        break
+
+                if newest is not None and (
+                    stored_taken_at is None or newest[0] > stored_taken_at
+                ):
+                    insta_post.last_taken_at, insta_post.last_media_pk = newest
+                insta_post.session = self.session
+                insta_post.loading_time = str(datetime.now())
+                self.db.commit()
 
                 return True
             else:
-                print("------------------------------logged_in else")
                 return False
         except Exception as e:
-            print(str(e))
+            logger.error(f"fetch_posts for {profile_username} failed: {e}")
+            # 실패한 트랜잭션을 정리해야 세션 플래그를 저장할 수 있음
+            self.db.rollback()
+            if isinstance(e, (LoginRequired, ChallengeRequired)):
+                client_pool.evict(self.session.id)
+                if isinstance(e, ChallengeRequired):
+                    self.session.hit_challenge()
+            elif isinstance(e, FeedbackRequired):
+                self.session.temp_block(FEEDBACK_BLOCK_SECONDS)
+            elif isinstance(e, (PleaseWaitFewMinutes, RateLimitError)):
+                self.session.temp_block()
+            elif isinstance(e, ClientConnectionError):
+                proxy_pool.report_failure(self.session.proxy_id, e)
+            if progress is not None:
+                progress.add_error(e)
             return False
 
-
-async def fetch_instagram_data(profile_username: str):
-    print("fetch_instagram_data----------------------")
-    insta_data_fetcher = InstagramDataFetcher()
-
-    await run_in_threadpool(insta_data_fetcher.fetch_posts, profile_username)
-    # asyncio.run(insta_data_fetcher.fetch_posts(profile_username))
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS
+from app.models import ProfileIndex
+
+
+def lookup_user_id(db: Session, username: str) -> Optional[str]:
+    """Return the user id stored in the profile index, if any"""
+    row = (
+        db.query(ProfileIndex.pk)
+        .filter(ProfileIndex.username == username.lower())
+        .first()
+    )
+    return row.pk if row else None
+
+
+def remember_users(db: Session, users: Iterable, commit: bool = True) -> int:
+    """Upsert instagrapi User/UserShort objects into the profile index"""
+    latest = {}
+    for user in users:
+        if user is not None and user.username and user.pk:
+            latest[user.username.lower()] = user
+    if not latest:
+        return 0
+
+    now = datetime.now()
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is None:
+        _remember_users_orm(db, latest, now)
+    else:
+        rows = [
+            {
+                "username": username,
+                "pk": str(user.pk),
+                "full_name": getattr(user, "full_name", None) or None,
+                "media_count": getattr(user, "media_count", None),
+                "last_seen": now,
+            }
+            for username, user in latest.items()
+        ]
+        stmt = upsert(ProfileIndex).values(rows)
+        # 여러 작업자가 같은 사용자를 동시에 기록해도 UNIQUE 충돌 없이 갱신
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["username"],
+                set_={
+                    "pk": stmt.excluded.pk,
+                    "full_name": func.coalesce(stmt.excluded.full_name, ProfileIndex.full_name),
+                    "media_count": func.coalesce(
+                        stmt.excluded.media_count, ProfileIndex.media_count
+                    ),
+                    "last_seen": stmt.excluded.last_seen,
+                },
+            )
+        )
+    if commit:
+        db.commit()
+    return len(latest)
+
+
+def _remember_users_orm(db: Session, latest: dict, now: datetime):
+    # ON CONFLICT를 지원하지 않는 DB용
+    existing = {
+        row.username: row
+        for row in db.query(ProfileIndex).filter(ProfileIndex.username.in_(list(latest)))
+    }
+    for username, user in latest.items():
+        row = existing.get(username)
+        if row is None:
+            row = ProfileIndex(username=username)
+            db.add(row)
+        row.pk = str(user.pk)
+        row.full_name = getattr(user, "full_name", None) or row.full_name
+        media_count = getattr(user, "media_count", None)
+        if media_count is not None:
+            row.media_count = media_count
+        row.last_seen = now
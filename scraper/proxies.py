@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import (
+    PROXY_CHECK_INTERVAL,
+    PROXY_CHECK_TIMEOUT,
+    PROXY_CHECK_URL,
+    PROXY_MAX_FAILURES,
+    PROXY_MAX_LATENCY_MS,
+)
+from app.database import session_scope
+from app.models import InstagramSession, Proxy
+
+logger = logging.getLogger(__name__)
+
+
+def mask_proxy_url(url: Optional[str]) -> Optional[str]:
+    """Proxy URL with its credentials replaced, safe for logs and API responses"""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    if not (parts.username or parts.password):
+        return url
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return parts._replace(netloc=f"***@{host}").geturl()
+
+
+def probe_proxy(url: str, check_url: str = PROXY_CHECK_URL, timeout: float = PROXY_CHECK_TIMEOUT):
+    """Send one request through the proxy, returning (latency_ms, error)"""
+    started = time.monotonic()
+    try:
+        response = requests.get(
+            check_url, proxies={"http": url, "https": url}, timeout=timeout
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        # 오류 메시지에 프록시 주소가 들어가도 자격 증명은 남기지 않음
+        return None, str(e).replace(url, mask_proxy_url(url))
+    return int((time.monotonic() - started) * 1000), None
+
+
+class ProxyPool:
+    """DB-backed proxy pool with health probes and sticky per-session assignment"""
+
+    def __init__(
+        self,
+        interval: int = PROXY_CHECK_INTERVAL,
+        max_latency_ms: int = PROXY_MAX_LATENCY_MS,
+        max_failures: int = PROXY_MAX_FAILURES,
+    ):
+        self.interval = interval
+        self.max_latency_ms = max_latency_ms
+        self.max_failures = max_failures
+        self.task = None
+
+    def seed(self, db: Session, urls: List[str]):
+        """Register proxies from configuration that are not in the DB yet"""
+        existing = {url for (url,) in db.query(Proxy.url)}
+        for url in urls:
+            if url not in existing:
+                db.add(Proxy(url=url))
+        db.commit()
+
+    def pick(self, db: Session) -> Optional[Proxy]:
+        """The healthy proxy with the fewest sessions, fastest first"""
+        assigned = func.count(InstagramSession.id)
+        row = (
+            db.query(Proxy, assigned)
+            .outerjoin(InstagramSession, InstagramSession.proxy_id == Proxy.id)
+            .filter(Proxy.is_active == True, Proxy.is_healthy == True)
+            .group_by(Proxy.id)
+            .order_by(assigned, Proxy.latency_ms.asc().nulls_last(), Proxy.id)
+            .first()
+        )
+        return row[0] if row else None
+
+    def assign(self, db: Session, session: InstagramSession) -> Optional[str]:
+        """Return the session's proxy URL, moving it to a healthy proxy when needed"""
+        proxy = session.proxy
+        if proxy is not None and proxy.is_active and proxy.is_healthy:
+            return proxy.url
+
+        proxy = self.pick(db)
+        if proxy is None and db.query(Proxy.id).first() is not None:
+            logger.warning(f"No healthy proxy for session {session.id}, connecting directly")
+        if session.proxy_id != (proxy.id if proxy else None):
+            session.proxy = proxy
+            db.commit()
+            logger.info(f"Session {session.id} assigned to proxy {proxy.id if proxy else None}")
+        return proxy.url if proxy else None
+
+    def proxy_for(self, session_id: int) -> Optional[str]:
+        """assign() for a session that is not attached to a DB session"""
+        with session_scope() as db:
+            session = db.get(InstagramSession, session_id)
+            return self.assign(db, session) if session else None
+
+    def report_failure(self, proxy_id: Optional[int], error, disable: bool = False):
+        """Count a connection failure seen while using the proxy"""
+        if proxy_id is None:
+            return
+        with session_scope() as db:
+            proxy = db.get(Proxy, proxy_id)
+            if proxy is None:
+                return
+            proxy.failures = (proxy.failures or 0) + 1
+            proxy.last_error = str(error)
+            if disable or proxy.failures >= self.max_failures:
+                proxy.is_healthy = False
+                logger.warning(f"Proxy {proxy_id} marked unhealthy: {error}")
+
+    def check_all(self) -> List[dict]:
+        """Probe every active proxy and update its health"""
+        with session_scope() as db:
+            proxies = [
+                (proxy.id, proxy.url)
+                for proxy in db.query(Proxy).filter(Proxy.is_active == True)
+            ]
+        if not proxies:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(16, len(proxies))) as executor:
+            results = list(executor.map(lambda proxy: probe_proxy(proxy[1]), proxies))
+
+        checked = []
+        with session_scope() as db:
+            for (proxy_id, _), (latency_ms, error) in zip(proxies, results):
+                proxy = db.get(Proxy, proxy_id)
+                if proxy is None:
+                    continue
+                if error is None and latency_ms > self.max_latency_ms:
+                    error = f"latency {latency_ms}ms over {self.max_latency_ms}ms"
+                proxy.latency_ms = latency_ms
+                proxy.last_checked = datetime.now()
+                if error is None:
+                    proxy.failures = 0
+                    proxy.is_healthy = True
+                    proxy.last_error = None
+                else:
+                    # 연속 실패가 한도를 넘으면 배정 대상에서 제외
+                    proxy.failures = (proxy.failures or 0) + 1
+                    proxy.last_error = error
+                    if proxy.failures >= self.max_failures:
+                        proxy.is_healthy = False
+                checked.append(
+                    {
+                        "id": proxy.id,
+                        "url": mask_proxy_url(proxy.url),
+                        "healthy": proxy.is_healthy,
+                        "latency_ms": latency_ms,
+                        "error": error,
+                    }
+                )
+        return checked
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.check_all)
+            except Exception as e:
+                logger.error(f"Proxy health check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+proxy_pool = ProxyPool()
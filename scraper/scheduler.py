@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.orm import Session
+
+from app.config import (
+    SESSION_ACQUIRE_TIMEOUT,
+    SESSION_BURST,
+    SESSION_MAX_LEASES,
+    SESSION_REQUESTS_PER_HOUR,
+)
+from app.models import InstagramSession, healthy_sessions_query
+from scraper.pacing import Pacer
+
+logger = logging.getLogger(__name__)
+
+
+class SessionUnavailable(ValueError):
+    """No session could be leased within the timeout"""
+
+
+class SessionScheduler:
+    """Hands out healthy sessions to concurrent callers and paces their requests"""
+
+    def __init__(
+        self,
+        requests_per_hour: float = SESSION_REQUESTS_PER_HOUR,
+        burst: int = SESSION_BURST,
+        max_leases: int = SESSION_MAX_LEASES,
+    ):
+        self.max_leases = max_leases
+        self.pacer = Pacer(requests_per_hour, burst)
+        self._leases = {}
+        self._last_acquired = {}
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+    def _pick(self, healthy):
+        candidates = [
+            session
+            for session in healthy
+            if self._leases.get(session.id, 0) < self.max_leases
+        ]
+        if not candidates:
+            return None
+        # 남은 예산이 가장 많고 가장 오래 쉰 계정 우선
+        return max(
+            candidates,
+            key=lambda session: (
+                self.pacer.available(session.id),
+                -self._last_acquired.get(session.id, 0),
+            ),
+        )
+
+    def acquire(self, db: Session, timeout: float = SESSION_ACQUIRE_TIMEOUT):
+        """Lease a healthy session, waiting in FIFO order until one is free"""
+        deadline = time.monotonic() + timeout
+        ticket = object()
+        with self._cond:
+            self._waiters.append(ticket)
+        try:
+            while True:
+                with self._cond:
+                    first = self._waiters[0] is ticket
+                healthy = None
+                if first:
+                    # DB 조회(만료된 임시 차단 해제 포함)는 잠금 밖에서: 다른 acquire/release가 기다리지 않음
+                    healthy = healthy_sessions_query(db).all()
+                with self._cond:
+                    if healthy is not None:
+                        session = self._pick(healthy)
+                        if session is not None:
+                            self._leases[session.id] = self._leases.get(session.id, 0) + 1
+                            self._last_acquired[session.id] = time.monotonic()
+                            return session
+                    elif self._waiters[0] is ticket:
+                        # 조회 사이에 앞 순서가 빠짐: 기다리지 않고 바로 조회
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    # 쿨다운 만료를 감지하기 위해 주기적으로 다시 확인
+                    self._cond.wait(min(remaining, 1.0))
+        finally:
+            with self._cond:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self, session_id: int):
+        with self._cond:
+            leases = self._leases.get(session_id, 0) - 1
+            if leases > 0:
+                self._leases[session_id] = leases
+            else:
+                self._leases.pop(session_id, None)
+            self._cond.notify_all()
+
+    def call(self, session_id: int, endpoint: str, fn, *args, **kwargs):
+        """Run an upstream request with adaptive pacing, backoff and retries"""
+        return self.pacer.call(session_id, endpoint, fn, *args, **kwargs)
+
+    def stats(self, db: Session):
+        healthy_ids = {session.id for session in healthy_sessions_query(db).all()}
+        sessions = []
+        pacing = self.pacer.stats()
+        for session in db.query(InstagramSession).order_by(InstagramSession.id).all():
+            endpoints = [entry for entry in pacing if entry["session_id"] == session.id]
+            sessions.append(
+                {
+                    "id": session.id,
+                    "username": session.username,
+                    "healthy": session.id in healthy_ids,
+                    "leases": self._leases.get(session.id, 0),
+                    "tokens": round(self.pacer.available(session.id), 2),
+                    "capacity": self.pacer.burst,
+                    "effective_per_hour": round(
+                        sum(entry["effective_per_hour"] for entry in endpoints), 1
+                    ),
+                    "endpoints": endpoints,
+                    "temp_block_until": session.temp_block_until,
+                    "number_of_use": session.number_of_use,
+                }
+            )
+        capacity = len(healthy_ids) * self.max_leases
+        leased = sum(s["leases"] for s in sessions if s["healthy"])
+        return {
+            "total": len(sessions),
+            "healthy": len(healthy_ids),
+            "leased": leased,
+            "waiting": len(self._waiters),
+            "utilization": round(leased / capacity, 3) if capacity else 0.0,
+            "requests_per_hour": self.pacer.rate * 3600,
+            "effective_per_hour": round(
+                sum(entry["effective_per_hour"] for entry in pacing), 1
+            ),
+            "sessions": sessions,
+        }
+
+
+session_scheduler = SessionScheduler()
@@ -1,10 +1,17 @@
+import logging
+
 from fastapi import HTTPException
 from instagrapi import Client
 from instagrapi.exceptions import LoginRequired
 from sqlalchemy.orm import Session
-from app.models import InstagramSession
+from app.metrics import LOGIN_SECONDS, observe
+from app.models import InstagramSession, release_expired_temp_blocks
+from scraper.client_pool import client_pool
+from scraper.proxies import proxy_pool
 from pydantic import BaseModel, ConfigDict
 
+logger = logging.getLogger(__name__)
+
 # Request 모델 추가
 class SessionRequest(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -25,9 +32,11 @@ class InstagramSessionManager:
         self.password = password
         self.db = db
         self.client = Client()
+        self.proxy = None
+        self.proxy_id = None
+        self.session_label = "new"
         
-        # 기본 설정
-        self.client.delay_range = [1, 3]
+        # 기본 설정 (요청 간격은 세션 스케줄러가 조절)
         self.client.logger.setLevel('DEBUG')
         self.client.set_locale('en_US')
         self.client.set_timezone_offset(-14400)
@@ -44,25 +53,34 @@ class InstagramSessionManager:
             )
             
             if existing_session:
-                print(f"Loading existing session for {self.username}")
+                logger.info(f"Loading existing session for {self.username}")
+                self.session_label = str(existing_session.id)
                 # 세션 상태 확인
                 if existing_session.is_block:
                     raise HTTPException(status_code=400, detail="Account is blocked")
                 if existing_session.is_challenge:
                     raise HTTPException(status_code=400, detail="Challenge required")
+                # 만료 시각이 없는 임시 차단에도 쿨다운을 부여하고 지난 차단은 해제
+                release_expired_temp_blocks(self.db)
                 if existing_session.is_temp_block:
                     raise HTTPException(status_code=400, detail="Account is temporarily blocked")
                 
+                # 세션에 고정된 프록시로 접속
+                proxy = proxy_pool.assign(self.db, existing_session)
+                self._use_proxy(proxy, existing_session.proxy_id)
+
                 # 저장된 세션 데이터 로드
                 self.client.set_settings(existing_session.session_data)
                 try:
                     self.client.get_timeline_feed()
-                    print("Session is valid")
+                    logger.info(f"Session for {self.username} is valid")
                 except LoginRequired:
-                    print("Session is invalid, performing fresh login")
+                    logger.info(f"Session for {self.username} is invalid, performing fresh login")
                     self._perform_login()
             else:
-                print("No existing session, performing fresh login")
+                logger.info(f"No existing session for {self.username}, performing fresh login")
+                proxy = proxy_pool.pick(self.db)
+                self._use_proxy(proxy.url if proxy else None, proxy.id if proxy else None)
                 self._perform_login()
 
             # DB 업데이트
@@ -75,25 +93,32 @@ class InstagramSessionManager:
             }
 
         except Exception as e:
-            print(f"Session initialization error: {str(e)}")
+            logger.error(f"Session initialization error: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail={"status": "error", "message": str(e)}
             )
 
+    def _use_proxy(self, url, proxy_id):
+        self.proxy = url
+        self.proxy_id = proxy_id
+        if url:
+            self.client.set_proxy(url)
+
     def _perform_login(self):
         """Perform Instagram login"""
         try:
-            login_result = self.client.login(self.username, self.password)
+            with observe(LOGIN_SECONDS, session=self.session_label, kind="init"):
+                login_result = self.client.login(self.username, self.password)
             
             if not login_result:
                 raise HTTPException(status_code=400, detail="Login failed")
             
-            print("Login successful")
+            logger.info(f"Login successful for {self.username}")
             return login_result
             
         except Exception as e:
-            print(f"Login error: {str(e)}")
+            logger.error(f"Login error for {self.username}: {str(e)}")
             raise
 
     def _update_database(self):
@@ -113,19 +138,24 @@ class InstagramSessionManager:
                 existing_session.is_block = False
                 existing_session.is_challenge = False
                 existing_session.is_temp_block = False
+                existing_session.temp_block_until = None
             else:
-                new_session = InstagramSession(
+                existing_session = InstagramSession(
                     username=self.username,
                     password=self.password,
                     session_data=session_data,
                     is_block=False,
                     is_challenge=False,
                     is_temp_block=False,
-                    number_of_use=0
+                    number_of_use=0,
+                    proxy_id=self.proxy_id,
                 )
-                self.db.add(new_session)
+                self.db.add(existing_session)
             
             self.db.commit()
+
+            # 방금 로그인한 클라이언트를 풀에 등록
+            client_pool.put(existing_session.id, self.client, self.proxy)
             
         except Exception as e:
             self.db.rollback()
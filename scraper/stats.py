@@ -0,0 +1,223 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import case, delete, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS
+from app.models import Media, ProfileStats, ProfileStatsWeek
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COLUMNS = (
+    "media_count",
+    "like_sum",
+    "comment_sum",
+    "photo_count",
+    "video_count",
+    "album_count",
+)
+WEEK_COLUMNS = ("media_count", "like_sum", "comment_sum")
+TYPE_COLUMNS = {1: "photo_count", 2: "video_count", 8: "album_count"}
+# 한 INSERT 문에 넣는 행 수 (SQLite 변수 개수 제한)
+UPSERT_CHUNK = 500
+
+STAT_FIELDS = (
+    Media.pk,
+    Media.profile,
+    Media.taken_at,
+    Media.media_type,
+    Media.like_count,
+    Media.comment_count,
+)
+
+
+def week_start(taken_at: Optional[datetime]) -> Optional[date]:
+    if taken_at is None:
+        return None
+    day = taken_at.date()
+    return day - timedelta(days=day.weekday())
+
+
+class StatsDelta:
+    """Changes to profile totals and weekly buckets caused by a batch of media writes"""
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: dict.fromkeys(TOTAL_COLUMNS, 0))
+        self.weeks = defaultdict(lambda: dict.fromkeys(WEEK_COLUMNS, 0))
+        self.first = {}
+        self.last = {}
+
+    def add(self, profile, taken_at, media_type, like_count, comment_count, sign=1, new=False):
+        if not profile:
+            return
+        likes = (like_count or 0) * sign
+        comments = (comment_count or 0) * sign
+        totals = self.totals[profile]
+        totals["media_count"] += sign
+        totals["like_sum"] += likes
+        totals["comment_sum"] += comments
+        type_column = TYPE_COLUMNS.get(media_type)
+        if type_column:
+            totals[type_column] += sign
+        if taken_at is None:
+            return
+        week = self.weeks[(profile, week_start(taken_at))]
+        week["media_count"] += sign
+        week["like_sum"] += likes
+        week["comment_sum"] += comments
+        if new:
+            # 기간은 새 media로만 넓어짐 (삭제나 시각 변경은 rebuild로 반영)
+            self.first[profile] = min(taken_at, self.first.get(profile, taken_at))
+            self.last[profile] = max(taken_at, self.last.get(profile, taken_at))
+
+    def apply(self, db: Session):
+        now = datetime.now()
+        totals = [
+            {
+                "profile": profile,
+                **values,
+                "first_taken_at": self.first.get(profile),
+                "last_taken_at": self.last.get(profile),
+                "updated_at": now,
+            }
+            for profile, values in self.totals.items()
+            # 좋아요 수가 그대로인 재크롤링은 쓰기를 만들지 않음
+            if any(values.values()) or profile in self.first
+        ]
+        weeks = [
+            {"profile": profile, "week_start": start, **values}
+            for (profile, start), values in self.weeks.items()
+            if any(values.values())
+        ]
+        upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert is None:
+            _apply_orm(db, totals, weeks)
+            return
+        for start in range(0, len(totals), UPSERT_CHUNK):
+            stmt = upsert(ProfileStats).values(totals[start : start + UPSERT_CHUNK])
+            excluded = stmt.excluded
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["profile"],
+                    set_={
+                        **{
+                            column: getattr(ProfileStats, column) + excluded[column]
+                            for column in TOTAL_COLUMNS
+                        },
+                        "first_taken_at": case(
+                            (
+                                or_(
+                                    ProfileStats.first_taken_at.is_(None),
+                                    excluded.first_taken_at < ProfileStats.first_taken_at,
+                                ),
+                                excluded.first_taken_at,
+                            ),
+                            else_=ProfileStats.first_taken_at,
+                        ),
+                        "last_taken_at": case(
+                            (
+                                or_(
+                                    ProfileStats.last_taken_at.is_(None),
+                                    excluded.last_taken_at > ProfileStats.last_taken_at,
+                                ),
+                                excluded.last_taken_at,
+                            ),
+                            else_=ProfileStats.last_taken_at,
+                        ),
+                        "updated_at": excluded.updated_at,
+                    },
+                )
+            )
+        for start in range(0, len(weeks), UPSERT_CHUNK):
+            stmt = upsert(ProfileStatsWeek).values(weeks[start : start + UPSERT_CHUNK])
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["profile", "week_start"],
+                    set_={
+                        column: getattr(ProfileStatsWeek, column) + stmt.excluded[column]
+                        for column in WEEK_COLUMNS
+                    },
+                )
+            )
+
+
+def _apply_orm(db: Session, totals: List[dict], weeks: List[dict]):
+    # ON CONFLICT를 지원하지 않는 DB용
+    for values in totals:
+        stats = db.get(ProfileStats, values["profile"])
+        if stats is None:
+            stats = ProfileStats(profile=values["profile"], **dict.fromkeys(TOTAL_COLUMNS, 0))
+            db.add(stats)
+        for column in TOTAL_COLUMNS:
+            setattr(stats, column, getattr(stats, column) + values[column])
+        first, last = values["first_taken_at"], values["last_taken_at"]
+        if first and (stats.first_taken_at is None or first < stats.first_taken_at):
+            stats.first_taken_at = first
+        if last and (stats.last_taken_at is None or last > stats.last_taken_at):
+            stats.last_taken_at = last
+        stats.updated_at = values["updated_at"]
+    for values in weeks:
+        week = db.get(ProfileStatsWeek, (values["profile"], values["week_start"]))
+        if week is None:
+            week = ProfileStatsWeek(
+                profile=values["profile"],
+                week_start=values["week_start"],
+                **dict.fromkeys(WEEK_COLUMNS, 0),
+            )
+            db.add(week)
+        for column in WEEK_COLUMNS:
+            setattr(week, column, getattr(week, column) + values[column])
+
+
+def record_media_stats(db: Session, old_rows: Iterable, new_values: Iterable[dict]):
+    """Move profile stats from the stored rows of a page to the values replacing them"""
+    delta = StatsDelta()
+    stored = set()
+    for row in old_rows:
+        stored.add(row.pk)
+        delta.add(
+            row.profile, row.taken_at, row.media_type, row.like_count, row.comment_count, sign=-1
+        )
+    for values in new_values:
+        delta.add(
+            values["profile"],
+            values["taken_at"],
+            values["media_type"],
+            values["like_count"],
+            values["comment_count"],
+            new=values["pk"] not in stored,
+        )
+    delta.apply(db)
+
+
+def rebuild_profile_stats(db: Session, profiles: List[str] = None) -> int:
+    """Recompute stats from the media table, for the given profiles or all of them"""
+    for model in (ProfileStats, ProfileStatsWeek):
+        stmt = delete(model)
+        if profiles is not None:
+            stmt = stmt.where(model.profile.in_(profiles))
+        db.execute(stmt)
+    query = select(*STAT_FIELDS)
+    if profiles is not None:
+        query = query.where(Media.profile.in_(profiles))
+    delta = StatsDelta()
+    for row in db.execute(query.execution_options(yield_per=5000)):
+        delta.add(
+            row.profile, row.taken_at, row.media_type, row.like_count, row.comment_count, new=True
+        )
+    delta.apply(db)
+    return len(delta.totals)
+
+
+def ensure_profile_stats(db: Session):
+    """Build stats once for media that were stored before stats existed"""
+    if db.query(ProfileStats.profile).first() is not None:
+        return
+    if db.query(Media.pk).first() is None:
+        return
+    count = rebuild_profile_stats(db)
+    db.commit()
+    logger.info(f"Built engagement stats for {count} profiles")
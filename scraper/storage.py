@@ -0,0 +1,167 @@
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS
+from app.models import HashtagMedia, Media, MediaResource
+from scraper.stats import STAT_FIELDS, record_media_stats
+
+
+def utc_naive(value):
+    """Naive UTC datetime: instagrapi times are aware, DateTime columns read back naive"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _url(value):
+    return str(value) if value else None
+
+
+def media_values(post, profile: str = None) -> dict:
+    """Column values of a Media row for an instagrapi Media"""
+    return {
+        "pk": str(post.pk),
+        "media_id": post.id,
+        "code": post.code,
+        "profile": profile or post.user.username,
+        "user_pk": str(post.user.pk) if post.user else None,
+        "taken_at": utc_naive(post.taken_at),
+        "media_type": post.media_type,
+        "caption": post.caption_text,
+        "like_count": post.like_count,
+        "comment_count": post.comment_count,
+        "thumbnail_url": _url(post.thumbnail_url),
+        "video_url": _url(post.video_url),
+    }
+
+
+def resource_values(post) -> List[dict]:
+    return [
+        {
+            "media_pk": str(post.pk),
+            "position": position,
+            "pk": str(resource.pk),
+            "media_type": resource.media_type,
+            "thumbnail_url": _url(resource.thumbnail_url),
+            "video_url": _url(resource.video_url),
+        }
+        for position, resource in enumerate(post.resources)
+    ]
+
+
+def apply_instagrapi_media(media: Media, post, profile: str = None):
+    """Copy an instagrapi Media onto a Media row"""
+    for key, value in media_values(post, profile).items():
+        setattr(media, key, value)
+    media.resources = [
+        MediaResource(**{k: v for k, v in values.items() if k != "media_pk"})
+        for values in resource_values(post)
+    ]
+    return media
+
+
+def save_medias(db: Session, medias: List, profile: str = None, commit: bool = True) -> int:
+    """Upsert a page of instagrapi medias keyed by pk, returning how many were new
+
+    Without a profile (hashtag results) new rows are filed under the author's username
+    and stored rows keep the profile they were crawled under.
+    Profile stats are moved from the stored rows to the new values in the same transaction.
+    """
+    if not medias:
+        return 0
+    # 같은 페이지에 같은 pk가 두 번 오면 마지막 값을 사용
+    posts = {str(post.pk): post for post in medias}
+    values = {pk: media_values(post, profile) for pk, post in posts.items()}
+
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is None:
+        stored = _stored_stats(db, list(posts))
+        _keep_profiles(values, stored, profile)
+        _save_medias_orm(db, posts, profile)
+    else:
+        now = datetime.now()
+        rows = {pk: {**values[pk], "created_at": now, "updated_at": now} for pk in posts}
+        # 신규 여부는 INSERT 결과로 판단: 동시에 같은 pk를 저장해도 한 쪽만 삽입됨
+        # (이 INSERT가 SQLite 쓰기 잠금을 잡으므로 커밋까지 다른 쓰기가 끼어들지 않음)
+        inserted = set(
+            db.scalars(
+                upsert(Media)
+                .values(list(rows.values()))
+                .on_conflict_do_nothing(index_elements=["pk"])
+                .returning(Media.pk)
+            )
+        )
+        existing = [pk for pk in posts if pk not in inserted]
+        stored = _stored_stats(db, existing) if existing else []
+        _keep_profiles(values, stored, profile)
+        if existing:
+            stmt = upsert(Media).values(
+                [{**rows[pk], "profile": values[pk]["profile"]} for pk in existing]
+            )
+            updated = {
+                column.name: stmt.excluded[column.name]
+                for column in Media.__table__.columns
+                if column.name not in ("pk", "created_at")
+            }
+            db.execute(stmt.on_conflict_do_update(index_elements=["pk"], set_=updated))
+        db.execute(delete(MediaResource).where(MediaResource.media_pk.in_(list(posts))))
+        resources = [row for post in posts.values() for row in resource_values(post)]
+        if resources:
+            db.execute(insert(MediaResource), resources)
+    record_media_stats(db, stored, values.values())
+
+    if commit:
+        db.commit()
+    return len(posts) - len(stored)
+
+
+def _stored_stats(db: Session, pks: List[str]) -> List:
+    # PostgreSQL은 행 잠금으로 커밋 전 다른 쓰기를 막음 (SQLite는 FOR UPDATE를 무시)
+    return db.execute(select(*STAT_FIELDS).where(Media.pk.in_(pks)).with_for_update()).all()
+
+
+def _keep_profiles(values: dict, stored: List, profile: str = None):
+    # 프로필을 모르는 쓰기(해시태그)가 크롤링된 게시물을 다른 프로필로 옮기지 않도록
+    if profile is None:
+        for row in stored:
+            values[row.pk]["profile"] = row.profile
+
+
+def _save_medias_orm(db: Session, posts: dict, profile: str = None):
+    # ON CONFLICT를 지원하지 않는 DB용
+    existing = {
+        media.pk: media for media in db.query(Media).filter(Media.pk.in_(list(posts))).all()
+    }
+    for pk, post in posts.items():
+        media = existing.get(pk)
+        if media is None:
+            media = Media(pk=pk)
+            db.add(media)
+        apply_instagrapi_media(media, post, profile or media.profile)
+
+
+def link_hashtag_medias(db: Session, hashtag: str, media_pks: List[str]) -> int:
+    """Record medias under a hashtag, ignoring links that already exist"""
+    if not media_pks:
+        return 0
+    now = datetime.now()
+    rows = [
+        {"hashtag": hashtag, "media_pk": str(pk), "first_seen": now}
+        for pk in dict.fromkeys(media_pks)
+    ]
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is None:
+        existing = set(
+            db.scalars(
+                select(HashtagMedia.media_pk)
+                .where(HashtagMedia.hashtag == hashtag)
+                .where(HashtagMedia.media_pk.in_([row["media_pk"] for row in rows]))
+            )
+        )
+        db.add_all(HashtagMedia(**row) for row in rows if row["media_pk"] not in existing)
+    else:
+        db.execute(upsert(HashtagMedia).values(rows).on_conflict_do_nothing())
+    return len(rows)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List
+
+from instagrapi.exceptions import (
+    ChallengeRequired,
+    ClientConnectionError,
+    FeedbackRequired,
+    LoginRequired,
+    PleaseWaitFewMinutes,
+    RateLimitError,
+)
+
+from app.config import (
+    DOWNLOAD_MEDIA,
+    FEEDBACK_BLOCK_SECONDS,
+    HASHTAG_SESSION_CONCURRENCY,
+    HASHTAG_WATCH_BATCH,
+    HASHTAG_WATCH_MAX_INTERVAL,
+    HASHTAG_WATCH_MAX_PAGES,
+    HASHTAG_WATCH_MIN_INTERVAL,
+    HASHTAG_WATCH_PAGE_SIZE,
+    HASHTAG_WATCH_TICK_SECONDS,
+)
+from app.database import session_scope
+from app.metrics import HASHTAG_WATCH_MEDIA, HASHTAG_WATCH_PAGES
+from app.models import HashtagWatch, InstagramSession
+from scraper.client_pool import client_pool
+from scraper.downloads import media_downloader
+from scraper.fanout import HashtagFanout, classify_error, load_healthy_sessions
+from scraper.profiles import remember_users
+from scraper.proxies import proxy_pool
+from scraper.scheduler import session_scheduler
+from scraper.storage import link_hashtag_medias, save_medias, utc_naive
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_hashtag(name: str) -> str:
+    return name.strip().lstrip("#").lower()
+
+
+def adapt_interval(
+    current: float,
+    new_count: int,
+    rate: float,
+    overflowed: bool,
+    low: float = HASHTAG_WATCH_MIN_INTERVAL,
+    high: float = HASHTAG_WATCH_MAX_INTERVAL,
+    page_size: int = HASHTAG_WATCH_PAGE_SIZE,
+) -> int:
+    """Next polling interval so that one poll finds about one page of new media"""
+    if overflowed:
+        # 최대 페이지까지 읽고도 따라잡지 못함: 바로 절반으로
+        interval = current / 2
+    elif new_count and rate > 0:
+        # 이전 간격과 평균을 내서 급격한 변화를 막음
+        interval = (current + page_size / rate) / 2
+    else:
+        interval = current * 2
+    return int(min(high, max(low, interval)))
+
+
+def _is_new(post, last_pk, last_taken_at) -> bool:
+    if last_taken_at is None:
+        return True
+    return utc_naive(post.taken_at) >= last_taken_at and str(post.pk) != last_pk
+
+
+def _span_rate(medias) -> float:
+    # 첫 폴링은 비교할 이전 폴링이 없으므로 페이지 안의 게시 시각 간격으로 추정
+    if len(medias) < 2:
+        return 0.0
+    taken = [post.taken_at for post in medias]
+    span = (max(taken) - min(taken)).total_seconds()
+    return (len(medias) - 1) / span if span > 0 else 0.0
+
+
+class HashtagWatcher:
+    """Polls watched hashtags when due, fetching only media newer than the last one seen"""
+
+    def __init__(
+        self,
+        tick: float = HASHTAG_WATCH_TICK_SECONDS,
+        batch: int = HASHTAG_WATCH_BATCH,
+        page_size: int = HASHTAG_WATCH_PAGE_SIZE,
+        max_pages: int = HASHTAG_WATCH_MAX_PAGES,
+        per_session_concurrency: int = HASHTAG_SESSION_CONCURRENCY,
+    ):
+        self.tick = tick
+        self.batch = batch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.per_session_concurrency = per_session_concurrency
+        self.task = None
+
+    def due(self, now: datetime = None) -> List[str]:
+        now = now or datetime.now()
+        with session_scope() as db:
+            rows = (
+                db.query(HashtagWatch.hashtag)
+                .filter(HashtagWatch.is_active == True)
+                .filter(HashtagWatch.next_poll_at <= now)
+                .order_by(HashtagWatch.next_poll_at)
+                .limit(self.batch)
+                .all()
+            )
+        return [row.hashtag for row in rows]
+
+    def poll(self, hashtag: str, client, session):
+        """Page a hashtag's recent feed until the last seen media; run by fan-out workers"""
+        try:
+            return self._poll(hashtag, client, session)
+        except Exception as e:
+            logger.warning(f"Polling hashtag {hashtag} on session {session.id} failed: {e}")
+            try:
+                self._handle_error(hashtag, session, e)
+            except Exception as db_error:
+                logger.error(f"Failed to record error for hashtag {hashtag}: {db_error}")
+            result = {"status": "error", "hashtag": hashtag, "error": str(e), "posts": []}
+            error_type = classify_error(e)
+            if error_type:
+                result["error_type"] = error_type
+            return result
+
+    def _poll(self, hashtag: str, client, session):
+        with session_scope() as db:
+            watch = db.query(HashtagWatch).filter(HashtagWatch.hashtag == hashtag).one()
+            last_pk, last_taken_at = watch.last_seen_pk, utc_naive(watch.last_seen_taken_at)
+            last_polled_at = watch.last_polled_at
+
+        new_medias = []
+        first_page = []
+        end_cursor = None
+        pages = 0
+        reached = False
+        while pages < self.max_pages:
+            medias, end_cursor = session_scheduler.call(
+                session.id,
+                "hashtag",
+                client.hashtag_medias_v1_chunk,
+                hashtag,
+                max_amount=self.page_size,
+                tab_key="recent",
+                max_id=end_cursor,
+            )
+            pages += 1
+            first_page = first_page or medias
+            fresh = [post for post in medias if _is_new(post, last_pk, last_taken_at)]
+            new_medias += fresh
+            # 첫 폴링은 한 페이지로 기준점만 잡고, 이후에는 마지막으로 본 media까지만
+            if last_taken_at is None or len(fresh) < len(medias) or not end_cursor:
+                reached = True
+                break
+        HASHTAG_WATCH_PAGES.inc(pages)
+        HASHTAG_WATCH_MEDIA.inc(len(new_medias))
+
+        now = datetime.now()
+        if last_polled_at is None or last_taken_at is None:
+            rate = _span_rate(first_page)
+        else:
+            rate = len(new_medias) / max((now - last_polled_at).total_seconds(), 1)
+
+        with session_scope() as db:
+            save_medias(db, new_medias, commit=False)
+            link_hashtag_medias(db, hashtag, [post.pk for post in new_medias])
+            watch = db.query(HashtagWatch).filter(HashtagWatch.hashtag == hashtag).one()
+            if new_medias:
+                newest = max(new_medias, key=lambda post: post.taken_at)
+                watch.last_seen_pk = str(newest.pk)
+                watch.last_seen_taken_at = utc_naive(newest.taken_at)
+            watch.interval_seconds = adapt_interval(
+                watch.interval_seconds,
+                len(new_medias),
+                rate,
+                overflowed=not reached,
+                low=watch.min_interval_seconds or HASHTAG_WATCH_MIN_INTERVAL,
+                high=watch.max_interval_seconds or HASHTAG_WATCH_MAX_INTERVAL,
+                page_size=self.page_size,
+            )
+            watch.last_polled_at = now
+            watch.next_poll_at = now + timedelta(seconds=watch.interval_seconds)
+            watch.last_new_count = len(new_medias)
+            watch.last_pages = pages
+            watch.total_media = (watch.total_media or 0) + len(new_medias)
+            watch.last_error = None
+            interval = watch.interval_seconds
+
+        # 프로필 인덱스와 파일 다운로드는 실패해도 폴링 결과에 영향 없음
+        try:
+            with session_scope() as db:
+                remember_users(db, [post.user for post in new_medias], commit=False)
+        except Exception as db_error:
+            logger.error(f"Failed to update profile index: {db_error}")
+        if DOWNLOAD_MEDIA and new_medias:
+            with session_scope() as db:
+                media_downloader.enqueue(db, new_medias)
+
+        logger.info(
+            f"Hashtag {hashtag}: {len(new_medias)} new in {pages} pages, "
+            f"next poll in {interval}s"
+        )
+        return {
+            "status": "success",
+            "hashtag": hashtag,
+            "new": len(new_medias),
+            "pages": pages,
+            "interval_seconds": interval,
+        }
+
+    def _handle_error(self, hashtag: str, session, error: Exception):
+        with session_scope() as db:
+            attached = db.get(InstagramSession, session.id)
+            if isinstance(error, (LoginRequired, ChallengeRequired)):
+                client_pool.evict(session.id)
+                attached.hit_challenge()
+            elif isinstance(error, FeedbackRequired):
+                attached.temp_block(FEEDBACK_BLOCK_SECONDS)
+            elif isinstance(error, (PleaseWaitFewMinutes, RateLimitError)):
+                attached.temp_block()
+            elif isinstance(error, ClientConnectionError):
+                proxy_pool.report_failure(session.proxy_id, error)
+            # 실패한 태그는 현재 간격 뒤에 다시 시도
+            watch = db.query(HashtagWatch).filter(HashtagWatch.hashtag == hashtag).one()
+            watch.last_error = str(error)
+            watch.next_poll_at = datetime.now() + timedelta(seconds=watch.interval_seconds)
+
+    async def run_once(self):
+        """Poll every due hashtag once, spread across the healthy sessions"""
+        hashtags = await asyncio.to_thread(self.due)
+        if not hashtags:
+            return []
+        sessions = await asyncio.to_thread(load_healthy_sessions)
+        if not sessions:
+            logger.warning(f"{len(hashtags)} hashtag watches due but no healthy session")
+            return []
+        fanout = HashtagFanout(self.per_session_concurrency)
+        try:
+            return [result async for result in fanout.run(hashtags, self.poll, sessions)]
+        except ValueError as e:
+            logger.warning(f"Hashtag watches skipped: {e}")
+            return []
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Hashtag watch tick failed: {e}")
+            await asyncio.sleep(self.tick)
+
+
+hashtag_watcher = HashtagWatcher()